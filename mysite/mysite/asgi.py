@@ -0,0 +1,11 @@
+"""
+ASGI entry point, async views wait for MongoDB without holding a worker thread. Run with
+"uvicorn mysite.asgi:application" from mysite directory.
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings.base")
+
+application = get_asgi_application()
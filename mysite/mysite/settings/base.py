@@ -75,6 +75,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "mysite.wsgi.application"
+ASGI_APPLICATION = "mysite.asgi.application"
 
 
 # Database
@@ -88,6 +89,18 @@ DATABASES = {
 }
 MONGODB_URI = "mongodb://127.0.0.1:27017/"
 MONGODB_NAME = "sortlogsdb"
+# options of MongoClient shared by process, for remote db add "compressors": "zstd,zlib"
+MONGODB_CLIENT_OPTIONS = {
+    "maxPoolSize": 50,
+    "minPoolSize": 0,
+    "maxIdleTimeMS": 60000,
+    "connectTimeoutMS": 5000,
+    "serverSelectionTimeoutMS": 10000,
+}
+# seconds catalog of log collections is cached in process
+SORTLOGS_CATALOG_TTL = 60.0
+# write log lines to collections of their "day" or "month", "" keeps one collection
+SORTLOGS_PARTITION = ""
 
 
 # Password validation
@@ -1,3 +1,5 @@
 from .base import *
 
 MONGODB_NAME = "test_sortlogsdb"
+# tests change db directly, catalog of collections is not cached
+SORTLOGS_CATALOG_TTL = 0
@@ -0,0 +1,111 @@
+"""
+Parse one big uncompressed log file in parallel. The file is split into byte ranges aligned to
+line boundaries and every range is parsed in worker process.
+"""
+import io
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator, Optional
+
+from .parsers import choose_parser, iter_lines_records
+from .structure import CHUNK_SIZE
+
+
+def split_file_ranges(
+    file_path: str, chunk_size: int = CHUNK_SIZE, file_size: Optional[int] = None
+) -> list[tuple[int, int]]:
+    """
+    Split the first file_size bytes of file (whole file by default) into (start, end) byte
+    ranges. Every range begins at the beginning of a line.
+    """
+    if file_size is None:
+        file_size = os.path.getsize(file_path)
+    ranges = []
+    start = 0
+    with open(file_path, "rb") as f:
+        while start < file_size:
+            end = start + chunk_size
+            if end < file_size:
+                # move end to the beginning of the next line
+                f.seek(end - 1)
+                f.readline()
+                end = f.tell()
+            end = min(end, file_size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_range(file_path: str, start: int, end: int) -> tuple[str, list[dict], int]:
+    """
+    Parse lines from byte range. Return continuation lines from the beginning of the range (they
+    belong to the last record of the previous range), records and number of lines.
+    """
+    file_modified_date = datetime.utcfromtimestamp(os.stat(file_path).st_mtime)
+    log_parser = choose_parser(os.path.basename(file_path), file_modified_date)
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    lines = io.TextIOWrapper(io.BytesIO(data)).readlines()
+    records = list(iter_lines_records(lines, log_parser))
+    head = ""
+    if records and records[0]["datetime"] is None:
+        head = records.pop(0)["line"]
+    return head, records, len(lines)
+
+
+class ChunkedRecords:
+    """
+    Iterate over records of the file parsed in chunks by process pool. Records are yielded in
+    file order and continuation lines crossing chunk boundary are joined with the previous record.
+    """
+
+    lines_number: int = 0
+
+    def __init__(
+        self,
+        file_path: str,
+        workers: int,
+        chunk_size: int = CHUNK_SIZE,
+        file_size: Optional[int] = None,
+    ) -> None:
+        """
+        Set file, pool size and how many bytes of the file are parsed (whole file by default)
+        """
+        self.file_path = file_path
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.file_size = file_size
+
+    def __iter__(self) -> Iterator[dict]:
+        """
+        Submit ranges to the pool keeping only a few chunks in flight
+        """
+        ranges = deque(split_file_ranges(self.file_path, self.chunk_size, self.file_size))
+        last_record = None
+        with ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            futures = deque()
+            while ranges or futures:
+                while ranges and len(futures) < self.workers * 2:
+                    start, end = ranges.popleft()
+                    futures.append(executor.submit(parse_range, self.file_path, start, end))
+
+                head, records, lines_number = futures.popleft().result()
+                self.lines_number += lines_number
+                if head and last_record:
+                    last_record["line"] = "".join((last_record["line"], head))
+
+                if records:
+                    if last_record:
+                        yield last_record
+                    last_record = records.pop()
+                    yield from records
+
+        if last_record:
+            yield last_record
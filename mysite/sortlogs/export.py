@@ -0,0 +1,108 @@
+"""
+Export logs as stream of bytes: NDJSON, CSV or raw lines, optionally gzipped. Records are
+formatted one by one and joined into chunks, so memory doesn't grow with number of records.
+"""
+import csv
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+from .structure import EXPORT_CHUNK_SIZE
+
+# format: (content type, filename extension)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ".ndjson"),
+    "csv": ("text/csv", ".csv"),
+    "lines": ("text/plain", ".log"),
+}
+EXPORT_FIELDS = ["datetime", "line"]
+
+
+def export_value(value: Any) -> Any:
+    """
+    Value which can be written to JSON or CSV, datetime is in ISO format
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class LineBuffer:
+    """
+    File-like object for csv.writer which returns written line instead of keeping it
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_ndjson(records: Iterable[dict], fields: list[str]) -> Iterator[str]:
+    """
+    One JSON object in every line
+    """
+    for record in records:
+        yield json.dumps({field: export_value(record.get(field)) for field in fields}) + "\n"
+
+
+def iter_csv(records: Iterable[dict], fields: list[str]) -> Iterator[str]:
+    """
+    CSV with header row
+    """
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(fields)
+    for record in records:
+        yield writer.writerow([export_value(record.get(field)) for field in fields])
+
+
+def iter_lines(records: Iterable[dict], fields: list[str]) -> Iterator[str]:
+    """
+    Log lines as they were in log file, other fields are not used
+    """
+    for record in records:
+        line = record.get("line", "")
+        yield line if line.endswith("\n") else f"{line}\n"
+
+
+FORMATTERS = {"ndjson": iter_ndjson, "csv": iter_csv, "lines": iter_lines}
+
+
+def iter_chunks(texts: Iterable[str], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Join small texts into encoded chunks of about chunk_size bytes
+    """
+    chunk: list[str] = []
+    length = 0
+    for text in texts:
+        chunk.append(text)
+        length += len(text)
+        if length >= chunk_size:
+            yield "".join(chunk).encode()
+            chunk = []
+            length = 0
+    if chunk:
+        yield "".join(chunk).encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compress chunks on the fly into one gzip stream
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_records(
+    records: Iterable[dict], export_format: str, fields: list[str], compress: bool = False
+) -> Iterator[bytes]:
+    """
+    Stream of bytes with records in export format
+    """
+    chunks = iter_chunks(FORMATTERS[export_format](records, fields))
+    return gzip_chunks(chunks) if compress else chunks
@@ -1,14 +1,28 @@
 import datetime
+import re
 
-from django.forms import Form, ChoiceField, IntegerField, DateTimeField
+from django.core.exceptions import ValidationError
+from django.forms import (
+    BooleanField,
+    CharField,
+    ChoiceField,
+    DateTimeField,
+    Form,
+    HiddenInput,
+    IntegerField,
+    MultipleChoiceField,
+)
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from .structure import TIME_RANGE_DAYS
+from .export import EXPORT_FIELDS, EXPORT_FORMATS
+from .structure import MAX_PAGE_SIZE, TIME_RANGE_DAYS
+from .tokens import MAX_TOKEN_LENGTH, MIN_TOKEN_LENGTH, line_tokens
 
 
 class ShowLogsForm(Form):
     """
-    Search logs form by table, date range and limit for lines
+    Search logs form by table, date range and limit for lines. Without first time logs are
+    searched from the beginning, it is useful with newest first order.
     """
 
     table = ChoiceField(
@@ -16,6 +30,7 @@ class ShowLogsForm(Form):
     )
     start_datetime = DateTimeField(
         label=_("First time"),
+        required=False,
     )
     end_datetime = DateTimeField(
         initial=timezone.now,
@@ -24,7 +39,53 @@ class ShowLogsForm(Form):
     limit = IntegerField(
         label=_("Lines limit"),
         initial=100,
+        min_value=1,
+        max_value=MAX_PAGE_SIZE,
+        help_text=_("Lines on one page"),
     )
+    newest_first = BooleanField(
+        label=_("Newest first"),
+        required=False,
+    )
+    status = CharField(
+        label=_("Status"),
+        required=False,
+        help_text=_("Nginx logs only, ex. 404 or 5xx"),
+    )
+    path = CharField(
+        label=_("Path begins with"),
+        required=False,
+    )
+    remote_addr = CharField(
+        label=_("Client IP"),
+        required=False,
+    )
+    contains = CharField(
+        label=_("Line contains"),
+        required=False,
+        help_text=_("Words, IPs, paths or request ids which all are in line"),
+    )
+
+    def clean_status(self):
+        """
+        Status is 3 digits or first digit and "xx"
+        """
+        status = self.cleaned_data["status"].strip().lower()
+        if status and not re.fullmatch(r"[1-5](\d\d|xx)", status):
+            raise ValidationError(_("Enter status like 404 or 5xx."))
+        return status
+
+    def clean_contains(self):
+        """
+        Contains has to give tokens, otherwise it would be no condition and every line matches
+        """
+        contains = self.cleaned_data["contains"].strip()
+        if contains and not line_tokens(contains):
+            raise ValidationError(
+                _("Enter words of %(min)d to %(max)d chars."),
+                params={"min": MIN_TOKEN_LENGTH, "max": MAX_TOKEN_LENGTH},
+            )
+        return contains
 
     def set_initial(self):
         """
@@ -40,3 +101,87 @@ class ShowLogsForm(Form):
         Prepare table choices structure for select field
         """
         self.fields["table"].choices = zip(table_list, table_list)
+
+
+class TimelineLogsForm(ShowLogsForm):
+    """
+    Search logs from many tables at once, lines are merged by time
+    """
+
+    table = None
+    tables = MultipleChoiceField(
+        label=_("Tables"),
+    )
+
+    def set_table_choices(self, table_list):
+        """
+        Prepare tables choices structure for multiple select field
+        """
+        self.fields["tables"].choices = zip(table_list, table_list)
+
+
+class ExportLogsForm(ShowLogsForm):
+    """
+    Export logs found by the same conditions as in search form. All lines are exported when
+    limit is empty.
+    """
+
+    # conditions taken from search form, they are hidden in export form
+    search_fields = [
+        "table",
+        "start_datetime",
+        "end_datetime",
+        "newest_first",
+        "status",
+        "path",
+        "remote_addr",
+        "contains",
+    ]
+
+    limit = IntegerField(
+        label=_("Lines limit"),
+        required=False,
+        min_value=1,
+    )
+    export_format = ChoiceField(
+        label=_("Format"),
+        choices=zip(EXPORT_FORMATS, EXPORT_FORMATS),
+        initial="ndjson",
+        required=False,
+    )
+    fields = CharField(
+        label=_("Fields"),
+        required=False,
+        help_text=_("Comma separated fields, default: datetime,line"),
+    )
+    compress = BooleanField(
+        label=_("Gzip"),
+        required=False,
+    )
+
+    @classmethod
+    def from_search(cls, search_form: ShowLogsForm) -> "ExportLogsForm":
+        """
+        Form for GET request with conditions submitted in search form as hidden fields, only
+        limit, format, fields and compression are shown
+        """
+        form = cls(
+            initial={name: search_form.data.get(name) for name in cls.search_fields},
+            auto_id="id_export_%s",
+        )
+        for name in cls.search_fields:
+            form.fields[name].widget = HiddenInput()
+        return form
+
+    def clean_export_format(self):
+        """
+        Format is NDJSON if not chosen
+        """
+        return self.cleaned_data["export_format"] or "ndjson"
+
+    def clean_fields(self):
+        """
+        List of field names
+        """
+        fields = [f.strip() for f in self.cleaned_data["fields"].split(",") if f.strip()]
+        return fields or EXPORT_FIELDS
@@ -0,0 +1,33 @@
+"""
+Drop partitions of log collections with logs older than number of days
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...mongo.logs_load import Loader, LogsFromDb
+
+
+class Command(BaseCommand):
+    help = "Drop day or month partitions of log collections which ended before DAYS days ago"
+
+    def add_arguments(self, parser):
+        parser.add_argument("days", type=int, help="How many days of logs are kept")
+        parser.add_argument(
+            "--table",
+            dest="tables",
+            nargs="+",
+            default=[],
+            help="Log collections (default all)",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Drop whole collections, logs in collections without partitions are not removed
+        """
+        before = timezone.now() - timedelta(days=options["days"])
+        loader = Loader()
+        for table_name in options["tables"] or LogsFromDb().get_tables():
+            for name in loader.drop_partitions(table_name, before):
+                self.stdout.write(f"{table_name}: dropped {name}")
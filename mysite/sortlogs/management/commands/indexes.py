@@ -0,0 +1,53 @@
+"""
+List, build and validate indexes of log collections
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from ...mongo.indexes import add_missing_tokens, create_indexes, missing_indexes
+from ...mongo.logs_load import LogsFromDb
+from ...parsers import parser_for_collection
+
+
+class Command(BaseCommand):
+    help = (
+        "List, build (in background) or validate indexes of all log collections, add tokens to "
+        "lines loaded without them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "action",
+            choices=["list", "build", "validate", "tokens"],
+            help=(
+                "list existing indexes, build missing ones, check that none is missing or add "
+                "tokens for search by content"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        """
+        Run action for every collection (and every partition) from LogsFromDb.get_catalog
+        """
+        logs_from_db = LogsFromDb()
+        missing_number = 0
+        for table_name, entry in logs_from_db.get_catalog().items():
+            log_parser = parser_for_collection(table_name)
+            for collection_name in entry["collections"]:
+                log_collection = logs_from_db.db[collection_name]
+                if options["action"] == "list":
+                    for name, info in log_collection.index_information().items():
+                        self.stdout.write(f"{collection_name}: {name} {info['key']}")
+                elif options["action"] == "build":
+                    for name in create_indexes(log_collection, log_parser, background=True):
+                        self.stdout.write(f"{collection_name}: {name}")
+                elif options["action"] == "tokens":
+                    updated = add_missing_tokens(log_collection)
+                    self.stdout.write(f"{collection_name}: {updated} lines got tokens")
+                else:
+                    missing = missing_indexes(log_collection, log_parser)
+                    missing_number += len(missing)
+                    for keys in missing:
+                        self.stdout.write(f"{collection_name}: missing {keys}")
+
+        if missing_number:
+            raise CommandError(f"Missing {missing_number} indexes, run: indexes build")
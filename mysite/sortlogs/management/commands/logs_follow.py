@@ -0,0 +1,56 @@
+"""
+Follow log files and load new lines to storage as they are written
+"""
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from ...mongo.follow import Follower
+from ...structure import BATCH_SIZE, FLUSH_INTERVAL, POLL_INTERVAL
+
+
+class Command(BaseCommand):
+    help = "Follow log files and load new lines to storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="+",
+            help="Files with logs, globs or directories",
+        )
+        parser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=BATCH_SIZE,
+            help=f"Write lines to db when so many are waiting (default {BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--flush-interval",
+            dest="flush_interval",
+            type=float,
+            default=FLUSH_INTERVAL,
+            help=f"Write lines to db at least every N seconds (default {FLUSH_INTERVAL})",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            dest="poll_interval",
+            type=float,
+            default=POLL_INTERVAL,
+            help=f"Check files for new lines every N seconds (default {POLL_INTERVAL})",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Run follower until it is interrupted
+        """
+        follower = Follower(
+            options["paths"],
+            batch_size=options["batch_size"],
+            flush_interval=options["flush_interval"],
+            poll_interval=options["poll_interval"],
+        )
+        try:
+            asyncio.run(follower.run())
+        except KeyboardInterrupt:
+            pass
@@ -3,7 +3,9 @@ Load logs to storage
 """
 from django.core.management.base import BaseCommand
 
-from ...mongo.logs_load import Loader
+from ...mongo.clients import pool_stats
+from ...mongo.parallel import load_files
+from ...structure import BATCH_SIZE
 import logging
 
 
@@ -14,14 +16,66 @@ class Command(BaseCommand):
         parser.add_argument(
             "--logs-file",
             dest="logs_file",
-            default=False,
-            help="File with logs",
+            nargs="+",
+            required=True,
+            help="Files with logs, globs or directories",
+        )
+        parser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=BATCH_SIZE,
+            help=f"How many log lines are sent to db in one bulk write (default {BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--workers",
+            dest="workers",
+            type=int,
+            default=1,
+            help="Number of processes loading files in parallel",
+        )
+        parser.add_argument(
+            "--file-workers",
+            dest="file_workers",
+            type=int,
+            default=1,
+            help="Number of processes parsing chunks of one uncompressed file",
+        )
+        parser.add_argument(
+            "--pipeline",
+            dest="pipeline",
+            action="store_true",
+            help="Read (decompress), parse and write to db in separate threads",
         )
 
     def handle(self, *args, **options):
         """
         Run command for logs loading
         """
-        logs_file = options["logs_file"]
-        Loader().load_file_logs(logs_file)
-        logging.info("Loaded to db file: %s", logs_file)
+        summary = load_files(
+            options["logs_file"],
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            file_workers=options["file_workers"],
+            pipeline=options["pipeline"],
+        )
+        wall_time = summary["wall_time"]
+        logging.info(
+            "Loaded %d files, %d lines, %d bytes in %.2fs (%.0f lines/s)",
+            summary["files"],
+            summary["lines"],
+            summary["bytes"],
+            wall_time,
+            summary["lines"] / wall_time if wall_time else 0,
+        )
+        for pid, worker in sorted(summary["workers"].items()):
+            logging.info(
+                "Worker %d: %d files, %d lines, %.0f lines/s",
+                pid,
+                worker["files"],
+                worker["lines"],
+                worker["lines_per_sec"],
+            )
+        logging.info("Db connections of main process: %s", pool_stats.get_stats())
+        if summary["failed"]:
+            logging.error("Failed files: %s", ", ".join(summary["failed"]))
@@ -0,0 +1,67 @@
+"""
+Measure how many lines per second every log parser can parse
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...parsers import (
+    CeleryParser,
+    MailParser,
+    NginxErrParser,
+    NginxLogParser,
+    PostgresParser,
+    RedisParser,
+    SupervisordParser,
+    UwsgiParser,
+)
+
+SAMPLE_LINES = {
+    NginxLogParser: '1.2.3.4 - - [16/Feb/2020:06:24:23 +0000] "GET /index.html HTTP/1.1" 200 191',
+    NginxErrParser: "2020/06/30 06:24:53 [error] 123#123: *1 open() failed",
+    UwsgiParser: "[pid: 28593|app: 0|req: 1/1] 1.2.3.4 () {52 vars} [Wed May 20 22:36:02 2020] GET",
+    CeleryParser: "[2019-06-03 03:41:18,934: ERROR/MainProcess] consumer: Cannot connect to redis",
+    MailParser: "2019 Jun 14 06:36:43 server postfix/smtps/smtpd[2299]: log message",
+    PostgresParser: "2021-09-02 17:23:40.866 UTC [123] LOG:  checkpoint starting: time",
+    RedisParser: "710:M 28 Aug 2022 00:01:00.138 * Background saving terminated with success",
+    SupervisordParser: "2021-09-09 21:23:43,286 INFO RPC interface 'supervisor' initialized",
+}
+
+
+class Command(BaseCommand):
+    help = "Measure parse speed (lines/s) of log parsers with fast decoders and with strptime"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lines",
+            dest="lines",
+            type=int,
+            default=100000,
+            help="How many lines every parser parses",
+        )
+
+    def measure(self, log_parser, line: str, lines: int) -> float:
+        """
+        Parse the same line many times and return lines per second
+        """
+        start_time = time.perf_counter()
+        for _ in range(lines):
+            log_parser.parse_line(line)
+        return lines / (time.perf_counter() - start_time)
+
+    def handle(self, *args, **options):
+        """
+        Print table with speed of every parser
+        """
+        lines = options["lines"]
+        self.stdout.write(f"{'parser':<20}{'fast lines/s':>15}{'strptime lines/s':>20}{'x':>8}")
+        for parser_class, line in SAMPLE_LINES.items():
+            log_parser = parser_class(year=2019)
+            # the same line is parsed every time, memoized date would be measured
+            log_parser.date_cache_size = 0
+            fast = self.measure(log_parser, line, lines)
+            log_parser.fast_date = None
+            slow = self.measure(log_parser, line, lines)
+            self.stdout.write(
+                f"{parser_class.__name__:<20}{fast:>15,.0f}{slow:>20,.0f}{fast / slow:>8.1f}"
+            )
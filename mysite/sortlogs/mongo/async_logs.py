@@ -0,0 +1,246 @@
+"""
+Get logs from db with asyncio client for async views. Queries are the same as in LogsFromDb, but
+view doesn't hold a thread while it waits for db, and queries of many collections run at the same
+time in one event loop. Under WSGI every request runs in its own event loop, asyncio client
+wouldn't be reused there, so queries of LogsFromDb run in thread with shared client instead.
+"""
+import asyncio
+import heapq
+from datetime import datetime
+from itertools import islice
+from typing import Any, Optional
+
+import pymongo
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+
+from .catalog import catalog
+from .clients import get_async_client
+from .logs_load import LogsFromDb
+from .partitions import overlapping_collections, partition_lanes
+from ..structure import LOADED_FILES, MAX_PAGE_SIZE
+
+
+class AsyncLogsFromDb:
+    """
+    Get logs from db, async version of LogsFromDb
+    """
+
+    def __init__(self) -> None:
+        """
+        Use client shared by running event loop
+        """
+        self.db = get_async_client()[settings.MONGODB_NAME]
+
+    async def get_logs(
+        self,
+        table_name: str,
+        start_datetime: Optional[datetime],
+        end_datetime: datetime,
+        limit: int,
+        filters: Optional[dict] = None,
+        projection: Optional[list[str]] = None,
+        newest_first: bool = False,
+    ) -> list[dict]:
+        """
+        Get logs from datetime range ordered by datetime, see LogsFromDb.get_logs. Limit 0 means
+        no limit.
+        """
+        direction = pymongo.DESCENDING if newest_first else pymongo.ASCENDING
+        return await self.find_logs(
+            await self.get_collections(table_name, start_datetime, end_datetime),
+            LogsFromDb.logs_query(start_datetime, end_datetime, filters),
+            direction,
+            limit,
+            projection,
+        )
+
+    async def get_collections(
+        self, table_name: str, start_datetime: Optional[datetime], end_datetime: datetime
+    ) -> list[str]:
+        """
+        Collections of log collection which can have logs from datetime range
+        """
+        names = (await self.get_catalog()).get(table_name, {}).get("collections", [table_name])
+        return overlapping_collections(names, start_datetime, end_datetime)
+
+    async def find_logs(
+        self,
+        names: list[str],
+        query: dict,
+        direction: int,
+        limit: int,
+        projection: Optional[list[str]] = None,
+    ) -> list[dict]:
+        """
+        Find logs in collections ordered by (datetime, _id), see LogsFromDb.find_logs. Lanes of
+        partitions are read at the same time, partitions of lane one after other until limit
+        records are found.
+        """
+
+        async def find(name: str, find_limit: int) -> list[dict]:
+            """
+            Logs from one collection
+            """
+            cursor = (
+                self.db[name]
+                .find(query, projection=projection)
+                .sort(LogsFromDb.logs_sort(direction))
+                .limit(find_limit)
+            )
+            return await cursor.to_list(None)
+
+        async def read_lane(lane: list[str]) -> list[dict]:
+            """
+            Logs from partitions of lane, they follow one after other
+            """
+            records: list[dict] = []
+            for name in lane:
+                records += await find(name, limit - len(records) if limit else 0)
+                if limit and len(records) >= limit:
+                    break
+            return records
+
+        if len(names) == 1:
+            return await find(names[0], limit)
+
+        if projection and "datetime" not in projection:
+            # records are merged by datetime
+            projection = [*projection, "datetime"]
+        newest_first = direction == pymongo.DESCENDING
+        lanes = await asyncio.gather(*map(read_lane, partition_lanes(names, newest_first)))
+        merged = heapq.merge(*lanes, key=LogsFromDb.record_key, reverse=newest_first)
+        return list(islice(merged, limit) if limit else merged)
+
+    async def get_timeline(
+        self,
+        table_names: list[str],
+        start_datetime: Optional[datetime],
+        end_datetime: datetime,
+        limit: int,
+        filters: Optional[dict] = None,
+        newest_first: bool = False,
+    ) -> list[dict]:
+        """
+        Get logs from many collections merged into one list ordered by datetime, see
+        LogsFromDb.get_timeline. Queries of all collections run at the same time.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        results = await asyncio.gather(
+            *(
+                self.get_logs(
+                    table_name,
+                    start_datetime,
+                    end_datetime,
+                    limit,
+                    filters,
+                    newest_first=newest_first,
+                )
+                for table_name in table_names
+            )
+        )
+        for table_name, records in zip(table_names, results):
+            for record in records:
+                record["source"] = table_name
+        merged = heapq.merge(*results, key=lambda r: r["datetime"], reverse=newest_first)
+        return list(islice(merged, limit))
+
+    async def get_logs_page(
+        self,
+        table_name: str,
+        start_datetime: Optional[datetime],
+        end_datetime: datetime,
+        limit: int,
+        filters: Optional[dict] = None,
+        after: Optional[tuple[datetime, Any]] = None,
+        before: Optional[tuple[datetime, Any]] = None,
+        newest_first: bool = False,
+    ) -> dict:
+        """
+        Get one page of logs ordered by (datetime, _id), see LogsFromDb.get_logs_page
+        """
+        query, direction, forward = LogsFromDb.page_query(
+            start_datetime, end_datetime, filters, after, before, newest_first
+        )
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        names = await self.get_collections(table_name, start_datetime, end_datetime)
+        logs = await self.find_logs(names, query, direction, limit + 1)
+        return LogsFromDb.make_page(logs, limit, forward, has_key=bool(after or before))
+
+    async def get_catalog(self) -> dict[str, dict]:
+        """
+        Log collections with numbers of documents and loaded files summary, catalog cached in
+        process is shared with LogsFromDb
+        """
+        return await catalog.get_async(self.db)
+
+    async def get_tables(self) -> list[str]:
+        """
+        Get collection names filtered by Level, they are taken from cached catalog
+        """
+        return list(await self.get_catalog())
+
+    async def get_loaded_files(self, table_name: str) -> list[dict]:
+        """
+        Get filenames and attrs from LOADED_FILES collection for specified table name
+        """
+        cursor = self.db[LOADED_FILES].find({"collection_name": table_name}).sort("filename", 1)
+        return await cursor.to_list(None)
+
+
+class ThreadedLogsFromDb:
+    """
+    Async methods of AsyncLogsFromDb which run LogsFromDb in thread
+    """
+
+    def __init__(self) -> None:
+        """
+        Use client shared by process
+        """
+        self.logs_from_db = LogsFromDb()
+
+    async def get_logs(self, *args, **kwargs) -> list[dict]:
+        """
+        Logs from datetime range, see LogsFromDb.get_logs
+        """
+        return await sync_to_async(lambda: list(self.logs_from_db.get_logs(*args, **kwargs)))()
+
+    async def get_timeline(self, *args, **kwargs) -> list[dict]:
+        """
+        Logs from many collections, see LogsFromDb.get_timeline
+        """
+        return await sync_to_async(self.logs_from_db.get_timeline)(*args, **kwargs)
+
+    async def get_logs_page(self, *args, **kwargs) -> dict:
+        """
+        One page of logs, see LogsFromDb.get_logs_page
+        """
+        return await sync_to_async(self.logs_from_db.get_logs_page)(*args, **kwargs)
+
+    async def get_catalog(self) -> dict[str, dict]:
+        """
+        Log collections from catalog cached in process
+        """
+        return await sync_to_async(self.logs_from_db.get_catalog)()
+
+    async def get_tables(self) -> list[str]:
+        """
+        Collection names from cached catalog
+        """
+        return await sync_to_async(self.logs_from_db.get_tables)()
+
+    async def get_loaded_files(self, table_name: str) -> list[dict]:
+        """
+        Filenames and attrs of loaded files of table name
+        """
+        return await sync_to_async(lambda: list(self.logs_from_db.get_loaded_files(table_name)))()
+
+
+def get_async_logs_from_db(request) -> Any:
+    """
+    AsyncLogsFromDb for request served by ASGI server, ThreadedLogsFromDb under WSGI
+    """
+    if isinstance(request, ASGIRequest):
+        return AsyncLogsFromDb()
+    return ThreadedLogsFromDb()
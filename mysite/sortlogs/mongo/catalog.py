@@ -0,0 +1,208 @@
+"""
+Catalog of log collections: names, numbers of documents, summary of loaded files and partitions
+(collections where logs are stored, see partitions module). It is kept in process for CATALOG_TTL
+seconds. After that version saved in db is checked, loader changes the version after every load,
+so catalog is built again only when something was loaded.
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Optional
+
+from django.conf import settings
+
+from .partitions import split_partition
+from ..structure import (
+    CATALOG,
+    CATALOG_TTL,
+    FIRST_LOG_TIME,
+    LAST_LOG_TIME,
+    LINES_NUMBER,
+    LOADED_FILES,
+    Level,
+)
+
+
+def get_catalog_version(db) -> Optional[int]:
+    """
+    Version of data in db, None before the first load
+    """
+    document = db[CATALOG].find_one({"_id": "version"})
+    return document["version"] if document else None
+
+
+def bump_catalog_version(db) -> None:
+    """
+    Mark that collections changed, catalogs in all processes are built again
+    """
+    db[CATALOG].update_one({"_id": "version"}, {"$inc": {"version": 1}}, upsert=True)
+    catalog.invalidate()
+
+
+def log_collection_names(names: list[str]) -> list[str]:
+    """
+    Sorted names of log collections (names begin with Level)
+    """
+    prefixes = tuple(f"{level}_" for level in Level.get_values())
+    return sorted(name for name in names if name.startswith(prefixes))
+
+
+# summary of loaded files for every collection
+LOADED_FILES_SUMMARY = [
+    {
+        "$group": {
+            "_id": "$collection_name",
+            "files": {"$sum": 1},
+            LINES_NUMBER: {"$sum": f"${LINES_NUMBER}"},
+            FIRST_LOG_TIME: {"$min": f"${FIRST_LOG_TIME}"},
+            LAST_LOG_TIME: {"$max": f"${LAST_LOG_TIME}"},
+        }
+    }
+]
+
+
+def group_partitions(names: list[str]) -> dict[str, list[str]]:
+    """
+    Log collection name: names of its partitions and of collection itself, if it exists
+    """
+    groups: dict[str, list[str]] = {}
+    for name in log_collection_names(names):
+        groups.setdefault(split_partition(name)[0], []).append(name)
+    return dict(sorted(groups.items()))
+
+
+def catalog_entry(collections: list[str], count: int, summary: Optional[dict]) -> dict:
+    """
+    Entry of log collection in catalog from its collections, number of their documents and
+    summary of loaded files
+    """
+    summary = summary or {}
+    return {
+        "count": count,
+        "collections": collections,
+        "files": summary.get("files", 0),
+        LINES_NUMBER: summary.get(LINES_NUMBER, 0),
+        FIRST_LOG_TIME: summary.get(FIRST_LOG_TIME),
+        LAST_LOG_TIME: summary.get(LAST_LOG_TIME),
+    }
+
+
+def build_catalog(db) -> dict[str, dict]:
+    """
+    Log collections with number of documents and summary of their loaded files
+    """
+    groups = group_partitions(db.list_collection_names())
+    files = {item["_id"]: item for item in db[LOADED_FILES].aggregate(LOADED_FILES_SUMMARY)}
+    return {
+        table_name: catalog_entry(
+            names,
+            sum(db[name].estimated_document_count() for name in names),
+            files.get(table_name),
+        )
+        for table_name, names in groups.items()
+    }
+
+
+async def get_catalog_version_async(db) -> Optional[int]:
+    """
+    Version of data in db read by asyncio client
+    """
+    document = await db[CATALOG].find_one({"_id": "version"})
+    return document["version"] if document else None
+
+
+async def build_catalog_async(db) -> dict[str, dict]:
+    """
+    Catalog built by asyncio client, numbers of documents are counted at the same time
+    """
+    groups = group_partitions(await db.list_collection_names())
+    cursor = await db[LOADED_FILES].aggregate(LOADED_FILES_SUMMARY)
+    files = {item["_id"]: item async for item in cursor}
+    all_names = [name for names in groups.values() for name in names]
+    numbers = await asyncio.gather(*(db[name].estimated_document_count() for name in all_names))
+    counts = dict(zip(all_names, numbers))
+    return {
+        table_name: catalog_entry(names, sum(counts[name] for name in names), files.get(table_name))
+        for table_name, names in groups.items()
+    }
+
+
+class CollectionCatalog:
+    """
+    Catalog cached in process. TTL 0 turns cache off.
+    """
+
+    def __init__(self, ttl: Optional[float] = None) -> None:
+        """
+        Empty catalog, TTL from settings if not given
+        """
+        self.ttl = ttl
+        self.tables: Optional[dict[str, dict]] = None
+        self.version: Optional[int] = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def get_ttl(self) -> float:
+        """
+        Seconds after which version in db is checked
+        """
+        if self.ttl is None:
+            return getattr(settings, "SORTLOGS_CATALOG_TTL", CATALOG_TTL)
+        return self.ttl
+
+    def cached(self) -> Optional[dict[str, dict]]:
+        """
+        Catalog if it was checked less than TTL ago, else None
+        """
+        tables = self.tables
+        if tables is not None and time.monotonic() - self.checked_at < self.get_ttl():
+            return tables
+        return None
+
+    def update(self, version: Optional[int], build: Callable[[], dict[str, dict]]) -> None:
+        """
+        Build catalog again if version in db changed, cache is off with TTL 0
+        """
+        if self.tables is None or version != self.version or not self.get_ttl():
+            self.tables = build()
+            self.version = version
+        self.checked_at = time.monotonic()
+
+    def get(self, db) -> dict[str, dict]:
+        """
+        Catalog from cache, it is built again when version in db changed
+        """
+        tables = self.cached()
+        if tables is not None:
+            return tables
+
+        with self.lock:
+            self.update(get_catalog_version(db), lambda: build_catalog(db))
+            return self.tables
+
+    async def get_async(self, db) -> dict[str, dict]:
+        """
+        Catalog from cache read by asyncio client. Event loop can't wait for the lock, so two
+        requests may build it at the same time, the later one wins.
+        """
+        tables = self.cached()
+        if tables is not None:
+            return tables
+
+        version = await get_catalog_version_async(db)
+        if self.tables is None or version != self.version or not self.get_ttl():
+            tables = await build_catalog_async(db)
+        else:
+            tables = self.tables
+        self.update(version, lambda: tables)
+        return tables
+
+    def invalidate(self) -> None:
+        """
+        Build catalog again on next get
+        """
+        self.tables = None
+
+
+# one catalog for process
+catalog = CollectionCatalog()
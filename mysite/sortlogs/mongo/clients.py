@@ -0,0 +1,144 @@
+"""
+One MongoClient for every MongoDB URI in process. Client has its own pool of connections and
+monitor threads, so it is created once and shared by all Loader and LogsFromDb objects. Clients
+are forgotten in child process after fork, child creates its own ones. Asyncio clients are bound
+to event loop, so they are shared only by coroutines of the same loop. They are used only in
+loop which lives as long as process (ASGI server).
+"""
+import asyncio
+import os
+import threading
+import weakref
+from collections import Counter
+
+import pymongo
+import pymongo.monitoring
+from django.conf import settings
+
+clients: dict[str, pymongo.MongoClient] = {}
+clients_lock = threading.Lock()
+# event loop: {uri: client}, clients are dropped with their loop
+async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class PoolStats(pymongo.monitoring.ConnectionPoolListener):
+    """
+    Count events of connection pools of all clients in process
+    """
+
+    def __init__(self) -> None:
+        """
+        Start with zero counts
+        """
+        self.counts: Counter = Counter()
+
+    def get_stats(self) -> dict:
+        """
+        Counts of connections: created, closed, checkouts, failed checkouts and connections in
+        use now
+        """
+        return {
+            "created": self.counts["created"],
+            "closed": self.counts["closed"],
+            "checked_out": self.counts["checked_out"],
+            "checkout_failed": self.counts["checkout_failed"],
+            "in_use": self.counts["checked_out"] - self.counts["checked_in"],
+        }
+
+    def connection_created(self, event) -> None:
+        self.counts["created"] += 1
+
+    def connection_closed(self, event) -> None:
+        self.counts["closed"] += 1
+
+    def connection_checked_out(self, event) -> None:
+        self.counts["checked_out"] += 1
+
+    def connection_check_out_failed(self, event) -> None:
+        self.counts["checkout_failed"] += 1
+
+    def connection_checked_in(self, event) -> None:
+        self.counts["checked_in"] += 1
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+
+pool_stats = PoolStats()
+
+
+def get_client(uri: str = "") -> pymongo.MongoClient:
+    """
+    Shared client for URI (settings.MONGODB_URI by default). Options like pool size, timeouts
+    and compressors are taken from settings.MONGODB_CLIENT_OPTIONS.
+    """
+    uri = uri or settings.MONGODB_URI
+    try:
+        return clients[uri]
+    except KeyError:
+        pass
+
+    with clients_lock:
+        if uri not in clients:
+            clients[uri] = pymongo.MongoClient(
+                uri,
+                event_listeners=[pool_stats],
+                **getattr(settings, "MONGODB_CLIENT_OPTIONS", {}),
+            )
+        return clients[uri]
+
+
+def get_async_client(uri: str = "") -> pymongo.AsyncMongoClient:
+    """
+    Shared asyncio client for URI in running event loop, options are the same as for
+    get_client. Coroutines of one loop run in one thread, so no lock is needed.
+    """
+    uri = uri or settings.MONGODB_URI
+    loop_clients = async_clients.setdefault(asyncio.get_running_loop(), {})
+    if uri not in loop_clients:
+        loop_clients[uri] = pymongo.AsyncMongoClient(
+            uri,
+            event_listeners=[pool_stats],
+            **getattr(settings, "MONGODB_CLIENT_OPTIONS", {}),
+        )
+    return loop_clients[uri]
+
+
+async def close_async_clients() -> None:
+    """
+    Close asyncio clients of running event loop, for loops which end before process (scripts,
+    tests)
+    """
+    for client in async_clients.pop(asyncio.get_running_loop(), {}).values():
+        await client.close()
+
+
+def forget_clients() -> None:
+    """
+    Drop clients copied from parent process, they can't be used after fork
+    """
+    global clients_lock
+    clients.clear()
+    async_clients.clear()
+    clients_lock = threading.Lock()
+    pool_stats.counts.clear()
+
+
+os.register_at_fork(after_in_child=forget_clients)
@@ -0,0 +1,223 @@
+"""
+Follow growing log files and load new lines to db as they are written
+"""
+import asyncio
+import glob
+import logging
+import os
+import time
+from datetime import datetime
+from typing import IO, Optional
+
+from .logs_load import Loader
+from .parallel import is_log_file
+from .record_ids import Occurrences
+from ..parsers import RecordsBuilder, choose_parser
+from ..readers import OffsetLines, is_rotated_file
+from ..structure import (
+    BATCH_SIZE,
+    COLLECTION_NAME,
+    FLUSH_INTERVAL,
+    LAST_LOG_TIME,
+    LAST_RECORD_ID,
+    OCCURRENCES,
+    POLL_INTERVAL,
+)
+
+
+class FollowedFile:
+    """
+    State of one followed file: open file, offset, record being built and records waiting for
+    write to db.
+    """
+
+    f: Optional[IO[bytes]] = None
+
+    def __init__(self, loader: Loader, file_path: str, batch_size: int, flush_interval: float):
+        """
+        Set parser and collection chosen by filename
+        """
+        self.loader = loader
+        self.file_path = file_path
+        self.filename = os.path.basename(file_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        file_modified_date = datetime.utcfromtimestamp(os.stat(file_path).st_mtime)
+        self.log_parser = choose_parser(self.filename, file_modified_date)
+        self.log_collection = loader.db[self.log_parser.get_collection_name()]
+        loader.ensure_indexes(self.log_collection, self.log_parser)
+        self.pending: list[dict] = []
+        self.flushed_at = time.monotonic()
+
+    def open(self) -> None:
+        """
+        Open file and continue from the offset of the previous load if file wasn't rotated
+        """
+        self.f = open(self.file_path, "rb")
+        self.stat = os.fstat(self.f.fileno())
+        self.file_info, self.offset = self.loader.start_file_loading(
+            self.filename, self.file_path, self.stat
+        )
+        self.builder = RecordsBuilder(self.log_parser)
+        self.occurrences = Occurrences(self.file_info.get(OCCURRENCES))
+        self.lines_number = 0
+        logging.info("Follow file %s from offset %d", self.file_path, self.offset)
+
+    def read(self, hold_tail: bool = True) -> None:
+        """
+        Read new complete lines and move finished records to pending list. The last line without
+        new line char is read too when file is finished (rotated).
+        """
+        lines = OffsetLines(self.f, self.offset, hold_tail)
+        for line in lines:
+            record = self.builder.push(line)
+            if record:
+                self.pending.append(record)
+        self.offset = lines.offset
+        self.lines_number += lines.lines_number
+
+    def flush(self) -> None:
+        """
+        Write pending records and save offset in LOADED_FILES
+        """
+        values = self.loader.insert_records(
+            self.log_collection,
+            self.pending,
+            self.batch_size,
+            self.file_info.get(LAST_RECORD_ID),
+            self.occurrences,
+            last_record_time=self.file_info.get(LAST_LOG_TIME),
+        )
+        self.pending = []
+        self.stat = os.fstat(self.f.fileno())
+        values[COLLECTION_NAME] = self.log_parser.get_collection_name()
+        self.loader.save_loaded_file(
+            self.file_info, self.file_path, self.stat, self.offset, values, self.lines_number
+        )
+        self.lines_number = 0
+        self.flushed_at = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Write the last record and close file
+        """
+        record = self.builder.pop()
+        if record:
+            self.pending.append(record)
+        self.flush()
+        self.f.close()
+        self.f = None
+
+    def is_rotated(self) -> bool:
+        """
+        Check if file under the path was replaced (rename and create) or truncated
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return False
+        return stat.st_ino != self.stat.st_ino or stat.st_size < self.offset
+
+    def poll(self) -> None:
+        """
+        Read new lines and write micro batch when it is big enough or old enough. After rotation
+        the rest of the old file is read and the new file is followed from the beginning.
+        """
+        if self.f is None:
+            if not os.path.exists(self.file_path):
+                return
+            self.open()
+
+        rotated = self.is_rotated()
+        self.read(hold_tail=not rotated)
+        if rotated:
+            logging.info("File %s rotated", self.file_path)
+            self.close()
+            self.open()
+            self.read()
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif time.monotonic() - self.flushed_at >= self.flush_interval:
+            # show the last record too, next continuation lines will be appended to it in db
+            record = self.builder.pop()
+            if record:
+                self.pending.append(record)
+            if self.pending or self.lines_number:
+                self.flush()
+            else:
+                self.flushed_at = time.monotonic()
+
+
+class Follower:
+    """
+    Follow many log files in one asyncio event loop. Every file is polled by its own task, file
+    reads and db writes run in threads.
+    """
+
+    def __init__(
+        self,
+        paths: list[str],
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        """
+        Set paths (files, globs or directories) and thresholds
+        """
+        self.paths = paths
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.loader = Loader()
+        self.tasks: dict[str, asyncio.Task] = {}
+
+    def discover(self) -> list[str]:
+        """
+        Find live (not rotated and uncompressed) files which match INPUT_FILES keys
+        """
+        files = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                candidates = [os.path.join(path, filename) for filename in os.listdir(path)]
+            else:
+                candidates = glob.glob(path)
+            files.extend(
+                p
+                for p in candidates
+                if os.path.isfile(p) and is_log_file(p) and not is_rotated_file(p)
+            )
+        return sorted(files)
+
+    async def follow_file(self, file_path: str) -> None:
+        """
+        Poll one file until task is cancelled
+        """
+        followed_file = FollowedFile(self.loader, file_path, self.batch_size, self.flush_interval)
+        try:
+            while True:
+                await asyncio.to_thread(followed_file.poll)
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            if followed_file.f is not None:
+                await asyncio.to_thread(followed_file.close)
+
+    def task_done(self, file_path: str, task: asyncio.Task) -> None:
+        """
+        Forget finished task, the file will be followed again after next discover
+        """
+        self.tasks.pop(file_path, None)
+        if not task.cancelled() and task.exception():
+            logging.error("Follow file %s failed: %s", file_path, task.exception())
+
+    async def run(self, discover_interval: float = 10.0) -> None:
+        """
+        Start task for every found file and look for new files from time to time
+        """
+        while True:
+            for file_path in await asyncio.to_thread(self.discover):
+                if file_path not in self.tasks:
+                    task = asyncio.create_task(self.follow_file(file_path))
+                    task.add_done_callback(lambda t, p=file_path: self.task_done(p, t))
+                    self.tasks[file_path] = task
+            await asyncio.sleep(discover_interval)
@@ -0,0 +1,60 @@
+"""
+Indexes of log collections. Every collection is searched by datetime range (with _id as tie
+breaker for the same datetime) and by tokens of lines, parsers add indexes for fields they
+extract.
+"""
+from typing import Any, Optional
+
+import pymongo
+
+from ..structure import BATCH_SIZE
+from ..tokens import record_tokens
+
+DATETIME_INDEX = [("datetime", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]
+TOKENS_INDEX = [("tokens", pymongo.ASCENDING), ("datetime", pymongo.ASCENDING)]
+
+
+def expected_indexes(log_parser: Optional[Any] = None) -> list[list[tuple[str, int]]]:
+    """
+    Indexes which collection of the parser should have
+    """
+    return [DATETIME_INDEX, TOKENS_INDEX] + (log_parser.indexes if log_parser else [])
+
+
+def missing_indexes(log_collection, log_parser: Optional[Any] = None) -> list:
+    """
+    Expected indexes which don't exist in collection
+    """
+    existing = [list(info["key"]) for info in log_collection.index_information().values()]
+    return [keys for keys in expected_indexes(log_parser) if keys not in existing]
+
+
+def create_indexes(log_collection, log_parser: Optional[Any] = None, background=False) -> list:
+    """
+    Create expected indexes, index which exists already is not changed. Return names of indexes.
+    """
+    return [
+        log_collection.create_index(keys, background=background)
+        for keys in expected_indexes(log_parser)
+    ]
+
+
+def add_missing_tokens(log_collection, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Add tokens to records loaded before loader added them, search by content doesn't find
+    records without tokens. Return number of updated records.
+    """
+    missing = {"tokens": {"$exists": False}}
+    updated = 0
+    requests = []
+    for record in log_collection.find(missing, projection=["line"], batch_size=batch_size):
+        tokens = record_tokens(record["line"])
+        requests.append(
+            pymongo.UpdateOne(dict(missing, _id=record["_id"]), {"$set": {"tokens": tokens}})
+        )
+        if len(requests) >= batch_size:
+            updated += log_collection.bulk_write(requests, ordered=False).modified_count
+            requests = []
+    if requests:
+        updated += log_collection.bulk_write(requests, ordered=False).modified_count
+    return updated
@@ -1,20 +1,62 @@
-import gzip
+import logging
 import os
-from itertools import count
+import heapq
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from itertools import chain, count, islice
 from datetime import datetime
 
+import bson
+import bson.errors
 import pymongo
-from typing import Optional, Any
+import pymongo.errors
+from typing import Any, Iterable, Iterator, Optional
 from django.conf import settings
-from ..parsers import LogLine, choose_parser
+from .catalog import bump_catalog_version, catalog
+from .clients import get_client
+from .indexes import create_indexes
+from .partitions import (
+    get_partition_layout,
+    overlapping_collections,
+    partition_lanes,
+    partition_name,
+    split_partition,
+)
+from .record_ids import Occurrences, line_key, record_id
+from .rollups import ROLLUPS_INDEX, rollup_updates, utc_naive
+from ..chunks import ChunkedRecords
+from ..parsers import choose_parser, iter_lines_records, parser_for_collection
+from ..pipeline import BatchWriter, ThreadedLines
+from ..readers import (
+    OffsetLines,
+    complete_lines_end,
+    file_fingerprint,
+    is_compressed,
+    is_rotated_file,
+    open_log_file,
+)
 from ..structure import (
+    BATCH_SIZE,
     COLLECTION_NAME,
+    FILE_SIZE,
+    FINGERPRINT,
+    FINGERPRINT_SIZE,
     FIRST_LOG_TIME,
+    INODE,
     LAST_LOG_TIME,
-    Level,
+    LAST_RECORD_ID,
     LINES_NUMBER,
     LOADED_FILES,
+    MAX_PAGE_SIZE,
+    OCCURRENCES,
+    OFFSET,
+    ROLLUPS,
 )
+from ..tokens import line_tokens, record_tokens
+
+DUPLICATE_KEY_ERROR = 11000
 
 
 class Database:
@@ -23,9 +65,10 @@ class Database:
     """
 
     def __init__(self) -> None:
-        """ """
-        client = pymongo.MongoClient(settings.MONGODB_URI)
-        self.db = client[settings.MONGODB_NAME]
+        """
+        Use client shared by process, so creating object doesn't open new connections
+        """
+        self.db = get_client()[settings.MONGODB_NAME]
 
 
 class Loader(Database):
@@ -33,18 +76,27 @@ class Loader(Database):
     Main class load logs data to db.
     """
 
-    log_line_before: Optional[LogLine] = None
     temporary_key: Optional[str] = None
     first_log_time: str
 
+    def __init__(self, partition: Optional[str] = None) -> None:
+        """
+        Connect to db, indexes are checked once for every collection. Partition layout ("day",
+        "month" or "" for none) is taken from settings if not given.
+        """
+        super().__init__()
+        self.indexed_collections: set[str] = set()
+        self.partition = get_partition_layout() if partition is None else partition
+
     def get_file_collections(self, filename: str) -> dict[str]:
         """
-        Get information about file from db
+        Get information about file from db. The last loading of the file is taken.
         """
         return self.db[LOADED_FILES].find_one(
             {
                 "filename": filename,
-            }
+            },
+            sort=[("_id", pymongo.DESCENDING)],
         )
 
     def set_file_collections(self, values: dict) -> pymongo.results.InsertOneResult:
@@ -59,13 +111,16 @@ class Loader(Database):
         """
         return bool(self.get_file_collections(filename))
 
-    def update_file_collections(self, collection_id, values):
+    def update_file_collections(self, collection_id, values, inc_values: Optional[dict] = None):
         """
         Update info about file in db
         """
+        update = {"$set": values}
+        if inc_values:
+            update["$inc"] = inc_values
         self.db[LOADED_FILES].find_one_and_update(
             filter={"_id": collection_id},
-            update={"$set": values},
+            update=update,
         )
 
     def calculate_logs_len(self, key: str) -> int:
@@ -74,70 +129,360 @@ class Loader(Database):
         """
         return self.db.base_keys.count()
 
-    def load_file_logs(self, file_path_str: str) -> None:
+    def ensure_indexes(self, log_collection, log_parser: Any) -> None:
         """
-        Load file with logs and start processing filelog
+        Create datetime index and indexes for fields extracted by parser if they don't exist.
+        It is done before the first write to the collection by this loader. Partitions get
+        indexes when the first line is written to them.
+        """
+        if ROLLUPS not in self.indexed_collections:
+            self.db[ROLLUPS].create_index(ROLLUPS_INDEX)
+            self.indexed_collections.add(ROLLUPS)
+        if log_collection.name not in self.indexed_collections and not self.partition:
+            create_indexes(log_collection, log_parser)
+            self.indexed_collections.add(log_collection.name)
+
+    def partition_collection(self, log_collection, value: Optional[datetime]):
+        """
+        Partition of log collection where log line with datetime is written, log collection
+        itself without partitions
+        """
+        if not self.partition or value is None:
+            return log_collection
+        partition = self.db[partition_name(log_collection.name, value, self.partition)]
+        if partition.name not in self.indexed_collections:
+            create_indexes(partition, parser_for_collection(log_collection.name))
+            self.indexed_collections.add(partition.name)
+        return partition
+
+    def drop_partitions(self, table_name: str, before: datetime) -> list[str]:
+        """
+        Drop partitions of log collection with logs older than datetime. Return their names.
+        """
+        before = utc_naive(before)
+        dropped = []
+        for name in self.db.list_collection_names():
+            collection_name, period = split_partition(name)
+            if collection_name == table_name and period and period[1] <= before:
+                self.db.drop_collection(name)
+                self.indexed_collections.discard(name)
+                dropped.append(name)
+        if dropped:
+            bump_catalog_version(self.db)
+        return sorted(dropped)
+
+    @staticmethod
+    def get_resume_offset(file_info: Optional[dict], file_path: str, stat: os.stat_result) -> int:
+        """
+        Find byte offset from which file has to be loaded. It is offset saved by the previous
+        load when file is the same file (inode and the first bytes didn't change) and it wasn't
+        truncated. Otherwise the file was rotated and it is loaded from 0. Compressed file can't
+        grow, so it is skipped (offset -1) when it was loaded completely.
+        """
+        if not file_info or file_info.get(OFFSET) is None:
+            return 0
+
+        offset = file_info[OFFSET]
+        if (
+            file_info.get(INODE) != stat.st_ino
+            or stat.st_size < offset
+            or file_info.get(FINGERPRINT)
+            != file_fingerprint(file_path, min(offset, FINGERPRINT_SIZE))
+        ):
+            return 0
+
+        if is_compressed(file_path):
+            return -1 if stat.st_size == offset else 0
+        return offset
+
+    def load_file_logs(
+        self,
+        file_path_str: str,
+        batch_size: int = BATCH_SIZE,
+        workers: int = 1,
+        pipeline: bool = False,
+    ) -> dict:
+        """
+        Load file with logs and start processing filelog. Records are read from the file as a
+        stream and sent to db with one unordered insert_many per batch. Uncompressed file can be
+        parsed in chunks by many worker processes, unless its parser is stateful.
+
+        With pipeline compressed file is decompressed and decoded in reader thread and batches
+        are written to db in writer thread, parsing runs between them.
+
+        File loaded before is loaded from the offset where the previous load stopped, so only new
+        lines are added. Rotated or truncated file is loaded from the beginning. The last line
+        without new line char is left for the next load, unless file is a finished rotation.
         """
-        first_date = None
         file_path = os.path.join(os.getcwd(), file_path_str)
         filename = file_path_str.split("/")[-1]
-        file_modified_date = datetime.utcfromtimestamp(os.stat(file_path).st_mtime)
-        if self.check_file_collections(filename):
-            pass  # raise Exception(f"The file '{filename}' has been previously uploaded.")
-
-        insert_result = self.set_file_collections({"filename": filename})
+        stat = os.stat(file_path)
+        file_modified_date = datetime.utcfromtimestamp(stat.st_mtime)
         log_parser = choose_parser(filename, file_modified_date)
         log_collection = self.db[log_parser.get_collection_name()]
+        self.ensure_indexes(log_collection, log_parser)
 
-        log_line = LogLine(log_parser)
+        file_info, offset = self.start_file_loading(filename, file_path, stat)
+        if offset < 0:
+            logging.info("File %s has been loaded before, skipped.", filename)
+            return {LINES_NUMBER: 0, COLLECTION_NAME: log_parser.get_collection_name()}
+        # last line without new line char of live file can be still written, it is loaded later
+        finished = is_rotated_file(filename)
+        last_record_id = file_info.get(LAST_RECORD_ID)
+        last_record_time = file_info.get(LAST_LOG_TIME)
+        occurrences = Occurrences(file_info.get(OCCURRENCES))
 
-        if filename.endswith(".gz"):
-            function_open = gzip.open
+        if pipeline:
+            writer_context = BatchWriter(partial(self.insert_log_lines, log_collection))
         else:
-            function_open = open
-        with function_open(file_path, "rt") as f:
-            lines_counter = count()  # starts from 0
-            for line in f.readlines():
-                next(lines_counter)  # this is line_nr - 1
-                log_line.set_line(line)
-
-                if log_line.update:
-                    self.update_log_line(log_collection, log_line)
-
-                if log_line.has_date:
-                    db_result = log_collection.insert_one(
-                        {
-                            "datetime": log_line.datetime,
-                            "line": log_line.line,
-                        }
+            writer_context = nullcontext()
+        with writer_context as writer:
+            if is_compressed(filename):
+                open_lines = ThreadedLines if pipeline else open_log_file
+                with open_lines(file_path) as f:
+                    lines_counter = count()  # starts from 0
+                    # zip takes line first, so counter is not moved after the last line
+                    lines = (line for line, _ in zip(f, lines_counter))
+                    records = iter_lines_records(lines, log_parser)
+                    values = self.insert_records(
+                        log_collection,
+                        records,
+                        batch_size,
+                        last_record_id,
+                        occurrences,
+                        writer,
+                        last_record_time,
                     )
-                    log_line.inserted_id = db_result.inserted_id
-                    if not first_date:
-                        first_date = log_line.datetime
-
-            if log_line.cache:
-                self.update_log_line(log_collection, log_line)
-
-            values = {
-                FIRST_LOG_TIME: first_date,
-                LAST_LOG_TIME: log_line.datetime,
-                LINES_NUMBER: next(lines_counter),
-                COLLECTION_NAME: log_parser.get_collection_name(),
-            }
-            self.update_file_collections(insert_result.inserted_id, values)
+                    lines_number = next(lines_counter)
+                offset = stat.st_size
+            elif workers > 1 and offset == 0 and not log_parser.stateful:
+                offset = stat.st_size if finished else complete_lines_end(file_path, stat.st_size)
+                records = ChunkedRecords(file_path, workers, file_size=offset)
+                values = self.insert_records(
+                    log_collection,
+                    records,
+                    batch_size,
+                    last_record_id,
+                    occurrences,
+                    writer,
+                    last_record_time,
+                )
+                lines_number = records.lines_number
+            else:
+                with open(file_path, "rb") as f:
+                    lines = OffsetLines(f, offset, hold_tail=not finished)
+                    records = iter_lines_records(lines, log_parser)
+                    values = self.insert_records(
+                        log_collection,
+                        records,
+                        batch_size,
+                        last_record_id,
+                        occurrences,
+                        writer,
+                        last_record_time,
+                    )
+                    lines_number = lines.lines_number
+                    offset = lines.offset
+
+        logging.info("Parsed dates cache for %s: %s", filename, log_parser.cache_info())
+        values[COLLECTION_NAME] = log_parser.get_collection_name()
+        self.save_loaded_file(file_info, file_path, stat, offset, values, lines_number)
+        values[LINES_NUMBER] = lines_number
+        return values
+
+    def start_file_loading(
+        self, filename: str, file_path: str, stat: os.stat_result
+    ) -> tuple[Optional[dict], int]:
+        """
+        Get info about the previous load of the file and offset from which file is loaded now.
+        For file loaded from the beginning new entry is added to LOADED_FILES.
+        """
+        file_info = self.get_file_collections(filename)
+        offset = self.get_resume_offset(file_info, file_path, stat)
+        if offset == 0:
+            file_info = {"filename": filename, LINES_NUMBER: 0}
+            file_info["_id"] = self.set_file_collections(file_info).inserted_id
+        return file_info, offset
+
+    def save_loaded_file(
+        self,
+        file_info: dict,
+        file_path: str,
+        stat: os.stat_result,
+        offset: int,
+        values: dict,
+        lines_number: int,
+    ) -> None:
+        """
+        Save in LOADED_FILES how far file was loaded and values returned by insert_records
+        """
+        values = dict(
+            values,
+            **{
+                INODE: stat.st_ino,
+                FILE_SIZE: stat.st_size,
+                OFFSET: offset,
+                FINGERPRINT: file_fingerprint(file_path, min(offset, FINGERPRINT_SIZE)),
+            },
+        )
+        if file_info.get(FIRST_LOG_TIME) or values[FIRST_LOG_TIME] is None:
+            # keep time of the first log from the previous load
+            values.pop(FIRST_LOG_TIME)
+        else:
+            file_info[FIRST_LOG_TIME] = values[FIRST_LOG_TIME]
+        if values[LAST_LOG_TIME] is None:
+            values.pop(LAST_LOG_TIME)
+            values.pop(LAST_RECORD_ID)
+        else:
+            file_info[LAST_RECORD_ID] = values[LAST_RECORD_ID]
+            file_info[LAST_LOG_TIME] = values[LAST_LOG_TIME]
+        self.update_file_collections(file_info["_id"], values, {LINES_NUMBER: lines_number})
+        bump_catalog_version(self.db)
+
+    def insert_records(
+        self,
+        log_collection,
+        records: Iterable[dict],
+        batch_size: int,
+        last_record_id: Any = None,
+        occurrences: Optional[Occurrences] = None,
+        writer: Optional[BatchWriter] = None,
+        last_record_time: Optional[datetime] = None,
+    ) -> dict:
+        """
+        Write records to db in batches. Every record gets id made from its content, so records
+        loaded before are skipped. Record gets tokens of its lines for search by content.
+        Continuation lines from the beginning (record without datetime) are appended to the last
+        record of the previous load, its datetime tells in which partition it is. Return datetime
+        of the first and the last record, id of the last record and counts of repeated lines. Id
+        is None when the last record was in db already, it can have its continuation lines there.
+
+        With writer batches are written by its thread, caller waits for them by closing writer.
+        The last batch is written by caller.
+        """
+        first_date = None
+        last_record = None
+        occurrences = occurrences or Occurrences()
+        pending: list[dict] = []
+        for record in records:
+            if record["datetime"] is None:
+                # lines before the first line with date
+                if last_record_id is not None:
+                    self.append_to_log_line(
+                        self.partition_collection(log_collection, last_record_time),
+                        last_record_id,
+                        record["line"],
+                    )
+                continue
+
+            key = line_key(log_collection.name, record["datetime"], record["line"])
+            record["_id"] = record_id(key, occurrences.next(record["datetime"], key))
+            record["tokens"] = record_tokens(record["line"])
+            if len(pending) >= batch_size:
+                self.write_batch(log_collection, pending, writer)
+            pending.append(record)
+            last_record = record
+            if not first_date:
+                first_date = record["datetime"]
+
+        # batch with the last record is written here, its id is kept only if it was inserted now
+        inserted = self.insert_log_lines(log_collection, pending)
+        return {
+            FIRST_LOG_TIME: first_date,
+            LAST_LOG_TIME: last_record["datetime"] if last_record else None,
+            LAST_RECORD_ID: (
+                last_record["_id"] if any(r is last_record for r in inserted) else None
+            ),
+            OCCURRENCES: occurrences.get_state(),
+        }
 
-    def update_log_line(self, log_collection, log_line):
+    def write_batch(
+        self, log_collection, pending: list[dict], writer: Optional[BatchWriter] = None
+    ) -> None:
+        """
+        Write pending records now or pass them to writer thread, the list is cleared
+        """
+        if writer is None:
+            self.insert_log_lines(log_collection, pending)
+        elif pending:
+            writer.submit(list(pending))
+            pending.clear()
+
+    @staticmethod
+    def append_to_log_line(log_collection, record_id: Any, line: str) -> None:
+        """
+        Add continuation lines and their tokens to log line which is already in db
+        """
         log_collection.update_one(
-            filter={"_id": log_line.inserted_id},
-            update={
-                "$set": {
-                    "line": log_line.line_update,
+            filter={"_id": record_id},
+            update=[
+                {
+                    "$set": {
+                        "line": {"$concat": ["$line", line]},
+                        "tokens": {
+                            "$setUnion": [{"$ifNull": ["$tokens", []]}, record_tokens(line)]
+                        },
+                    }
                 }
-            },
+            ],
         )
-        log_line.line_update = None
-        log_line.update = False
-        log_line.cache = False
+
+    def insert_log_lines(self, log_collection, pending: list[dict]) -> list[dict]:
+        """
+        Send pending records to db and clear the list. Records are written to partitions of
+        their datetimes, if collection is partitioned. Inserted records are added to rollups.
+        Return inserted records.
+        """
+        if not pending:
+            return []
+
+        records = pending[:]
+        pending.clear()
+        partitions: dict[str, list[dict]] = {}
+        if self.partition:
+            for record in records:
+                name = partition_name(log_collection.name, record["datetime"], self.partition)
+                partitions.setdefault(name, []).append(record)
+        else:
+            partitions[log_collection.name] = records
+
+        inserted = []
+        for partition_records in partitions.values():
+            collection = self.partition_collection(log_collection, partition_records[0]["datetime"])
+            inserted += self.upsert_records(collection, partition_records)
+        self.update_rollups(log_collection.name, inserted)
+        return inserted
+
+    @staticmethod
+    def upsert_records(log_collection, records: list[dict]) -> list[dict]:
+        """
+        Send records to collection in one unordered bulk upsert. Records which are in db already
+        are skipped. Return inserted records.
+        """
+        requests = [
+            pymongo.UpdateOne(
+                {"_id": record["_id"]},
+                {"$setOnInsert": {k: v for k, v in record.items() if k != "_id"}},
+                upsert=True,
+            )
+            for record in records
+        ]
+        try:
+            upserted_indexes = list(log_collection.bulk_write(requests, ordered=False).upserted_ids)
+        except pymongo.errors.BulkWriteError as e:
+            # the same record upserted at the same time by other process
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in e.details["writeErrors"]):
+                raise
+            upserted_indexes = [upserted["index"] for upserted in e.details["upserted"]]
+        return [records[i] for i in upserted_indexes]
+
+    def update_rollups(self, collection_name: str, records: list[dict]) -> None:
+        """
+        Add inserted records to counts per minute, hour and day
+        """
+        updates = rollup_updates(collection_name, records)
+        if updates:
+            self.db[ROLLUPS].bulk_write(updates, ordered=False)
 
 
 class LogsFromDb(Database):
@@ -146,30 +491,316 @@ class LogsFromDb(Database):
     """
 
     def get_logs(
-        self, table_name: str, start_datetime: datetime, end_datetime: datetime, limit: int
+        self,
+        table_name: str,
+        start_datetime: Optional[datetime],
+        end_datetime: datetime,
+        limit: int,
+        filters: Optional[dict] = None,
+        projection: Optional[list[str]] = None,
+        batch_size: int = 0,
+        newest_first: bool = False,
     ) -> Any:
-        """ """
-        collection = (
-            self.db[table_name]
+        """
+        Get logs from datetime range ordered by datetime. Filters are conditions for other fields,
+        see fields_filter. Limit 0 means no limit. Projection is list of returned fields. Cursor
+        gets records from db in batches of batch_size (0 means default of server). Only
+        partitions which overlap datetime range are queried.
+        """
+        direction = pymongo.DESCENDING if newest_first else pymongo.ASCENDING
+        return self.find_logs(
+            self.get_collections(table_name, start_datetime, end_datetime),
+            self.logs_query(start_datetime, end_datetime, filters),
+            direction,
+            limit,
+            projection,
+            batch_size,
+        )
+
+    def get_collections(
+        self, table_name: str, start_datetime: Optional[datetime], end_datetime: datetime
+    ) -> list[str]:
+        """
+        Collections of log collection which can have logs from datetime range: its partitions
+        and collection itself, see partitions module
+        """
+        names = self.get_catalog().get(table_name, {}).get("collections", [table_name])
+        return overlapping_collections(names, start_datetime, end_datetime)
+
+    def find_logs(
+        self,
+        names: list[str],
+        query: dict,
+        direction: int,
+        limit: int,
+        projection: Optional[list[str]] = None,
+        batch_size: int = 0,
+    ) -> Any:
+        """
+        Find logs in collections, records come ordered by (datetime, _id) like from one cursor.
+        Partition is queried only when records of partitions before it were taken.
+        """
+        if len(names) == 1:
+            return (
+                self.db[names[0]]
+                .find(query, projection=projection)
+                .sort(self.logs_sort(direction))
+                .limit(limit)
+                .batch_size(batch_size)
+            )
+
+        if projection and "datetime" not in projection:
+            # records are merged by datetime
+            projection = [*projection, "datetime"]
+        newest_first = direction == pymongo.DESCENDING
+        lanes = [
+            chain.from_iterable(
+                self.find_logs([name], query, direction, limit, projection, batch_size)
+                for name in lane
+            )
+            for lane in partition_lanes(names, newest_first)
+        ]
+        merged = heapq.merge(*lanes, key=self.record_key, reverse=newest_first)
+        return islice(merged, limit) if limit else merged
+
+    @staticmethod
+    def record_key(record: dict) -> tuple[datetime, Any]:
+        """
+        Key of order of logs
+        """
+        return record["datetime"], record["_id"]
+
+    @staticmethod
+    def logs_query(
+        start_datetime: Optional[datetime], end_datetime: datetime, filters: Optional[dict] = None
+    ) -> dict:
+        """
+        Query for datetime range and conditions for other fields
+        """
+        datetime_range = {"$lte": end_datetime}
+        if start_datetime:
+            datetime_range["$gte"] = start_datetime
+        return {"datetime": datetime_range, **(filters or {})}
+
+    @staticmethod
+    def logs_sort(direction: int) -> list[tuple[str, int]]:
+        """
+        Order of logs by datetime index, _id is tie breaker
+        """
+        return [("datetime", direction), ("_id", direction)]
+
+    def get_timeline(
+        self,
+        table_names: list[str],
+        start_datetime: Optional[datetime],
+        end_datetime: datetime,
+        limit: int,
+        filters: Optional[dict] = None,
+        newest_first: bool = False,
+    ) -> list[dict]:
+        """
+        Get logs from many collections merged into one list ordered by datetime. Every record
+        has "source" with collection name. Queries run at the same time in threads. Records are
+        merged lazily from sorted cursors, so only limit records are taken from db.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        def first_record(table_name: str) -> tuple[str, Any, Optional[dict]]:
+            """
+            Run query, the first batch comes with the first record
+            """
+            cursor = self.get_logs(
+                table_name,
+                start_datetime,
+                end_datetime,
+                limit,
+                filters,
+                batch_size=limit,
+                newest_first=newest_first,
+            )
+            return table_name, cursor, next(cursor, None)
+
+        def tagged(table_name: str, records: Iterable[dict]) -> Iterator[dict]:
+            """
+            Add name of collection to records
+            """
+            for record in records:
+                record["source"] = table_name
+                yield record
+
+        if not table_names:
+            return []
+        with ThreadPoolExecutor(max_workers=len(table_names)) as executor:
+            started = list(executor.map(first_record, table_names))
+        cursors = [
+            tagged(table_name, chain([record], cursor))
+            for table_name, cursor, record in started
+            if record is not None
+        ]
+        merged = heapq.merge(*cursors, key=lambda r: r["datetime"], reverse=newest_first)
+        return list(islice(merged, limit))
+
+    def get_logs_page(
+        self,
+        table_name: str,
+        start_datetime: Optional[datetime],
+        end_datetime: datetime,
+        limit: int,
+        filters: Optional[dict] = None,
+        after: Optional[tuple[datetime, Any]] = None,
+        before: Optional[tuple[datetime, Any]] = None,
+        newest_first: bool = False,
+    ) -> dict:
+        """
+        Get one page of logs ordered by (datetime, _id), oldest or newest first. Page starts
+        after key of the last record of the previous page (next page) or ends before key of the
+        first record of the next page (previous page). Query continues index scan from the key,
+        so every page costs the same however deep it is. Newest first scans the same index
+        backwards. Only partitions which overlap datetime range are queried.
+
+        Return logs and keys for next and previous page, key is None when there is no page.
+        """
+        query, direction, forward = self.page_query(
+            start_datetime, end_datetime, filters, after, before, newest_first
+        )
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        names = self.get_collections(table_name, start_datetime, end_datetime)
+        logs = list(self.find_logs(names, query, direction, limit + 1))
+        return self.make_page(logs, limit, forward, has_key=bool(after or before))
+
+    @classmethod
+    def page_query(
+        cls,
+        start_datetime: Optional[datetime],
+        end_datetime: datetime,
+        filters: Optional[dict] = None,
+        after: Optional[tuple[datetime, Any]] = None,
+        before: Optional[tuple[datetime, Any]] = None,
+        newest_first: bool = False,
+    ) -> tuple[dict, int, bool]:
+        """
+        Query of page, direction of sort and whether page is scanned forward (to the next page)
+        """
+        query = cls.logs_query(start_datetime, end_datetime, filters)
+
+        # forward is the direction of scan: to newer records or to older ones
+        forward = before is None
+        cursor_key = after if forward else before
+        direction = pymongo.ASCENDING if forward != newest_first else pymongo.DESCENDING
+        if cursor_key:
+            operator = "$gt" if direction == pymongo.ASCENDING else "$lt"
+            key_datetime, key_id = cursor_key
+            query = {
+                "$and": [
+                    query,
+                    {
+                        "$or": [
+                            {"datetime": {operator: key_datetime}},
+                            {"datetime": key_datetime, "_id": {operator: key_id}},
+                        ]
+                    },
+                ]
+            }
+        return query, direction, forward
+
+    @classmethod
+    def make_page(cls, logs: list[dict], limit: int, forward: bool, has_key: bool) -> dict:
+        """
+        Page from limit + 1 records found by page_query
+        """
+        has_more = len(logs) > limit
+        logs = logs[:limit]
+        if not forward:
+            logs.reverse()
+
+        # page reached with key has records on the other side of the key
+        has_next = has_more if forward else True
+        has_previous = has_key if forward else has_more
+        return {
+            "logs": logs,
+            "next": cls.page_key(logs[-1]) if logs and has_next else None,
+            "previous": cls.page_key(logs[0]) if logs and has_previous else None,
+        }
+
+    @staticmethod
+    def page_key(record: dict) -> str:
+        """
+        Key of record used as cursor of page, "2021-08-22T00:00:58_<id>"
+        """
+        return f"{record['datetime'].isoformat()}_{record['_id']}"
+
+    @staticmethod
+    def parse_page_key(key: Optional[str]) -> Optional[tuple[datetime, Any]]:
+        """
+        Datetime and id from key made by page_key, None for empty or wrong key
+        """
+        if not key:
+            return None
+        key_datetime, _, key_id = key.rpartition("_")
+        try:
+            return datetime.fromisoformat(key_datetime), bson.ObjectId(key_id)
+        except (ValueError, bson.errors.InvalidId):
+            return None
+
+    @staticmethod
+    def fields_filter(
+        status: Optional[str] = None,
+        path: Optional[str] = None,
+        remote_addr: Optional[str] = None,
+        contains: Optional[str] = None,
+    ) -> dict:
+        """
+        Make conditions for fields extracted from nginx log lines. Status can be exact ("404") or
+        class of statuses ("5xx"). Path is prefix of request path, anchored regex can use index.
+        Contains are words (or IPs, paths, ids) which all have to be in log line, they are found
+        by tokens index. Contains without tokens is no condition, search form rejects it.
+        """
+        filters = {}
+        if contains:
+            tokens = line_tokens(contains)
+            if tokens:
+                filters["tokens"] = {"$all": tokens}
+        if status:
+            if status.endswith("xx"):
+                first_digit = int(status[0])
+                filters["status"] = {"$gte": first_digit * 100, "$lt": (first_digit + 1) * 100}
+            else:
+                filters["status"] = int(status)
+        if path:
+            filters["path"] = {"$regex": f"^{re.escape(path)}"}
+        if remote_addr:
+            filters["remote_addr"] = remote_addr
+        return filters
+
+    def get_rollups(
+        self, table_name: str, unit: str, start_datetime: datetime, end_datetime: datetime
+    ) -> list[dict]:
+        """
+        Counts of log lines per unit (minute, hour or day) ordered by time
+        """
+        return list(
+            self.db[ROLLUPS]
             .find(
                 {
-                    "datetime": {"$gte": start_datetime, "$lte": end_datetime},
+                    "collection": table_name,
+                    "unit": unit,
+                    "time": {"$gte": start_datetime, "$lte": end_datetime},
                 }
             )
-            .limit(limit)
+            .sort("time", pymongo.ASCENDING)
         )
-        return collection
+
+    def get_catalog(self) -> dict[str, dict]:
+        """
+        Log collections with numbers of documents and loaded files summary, see catalog module
+        """
+        return catalog.get(self.db)
 
     def get_tables(self) -> list[str]:
         """
-        Get collection names from db filtered by Level
+        Get collection names filtered by Level, they are taken from cached catalog
         """
-        names = []
-        for name in self.db.list_collection_names():
-            for begin in Level.get_values():
-                if name.startswith(f"{begin}_"):
-                    names.append(name)
-        return sorted(names)
+        return list(self.get_catalog())
 
     def get_loaded_files(self, table_name):
         """
@@ -0,0 +1,149 @@
+"""
+Load many log files at once with a pool of worker processes
+"""
+import glob
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
+
+from .logs_load import Loader
+from ..structure import BATCH_SIZE, INPUT_FILES, LINES_NUMBER
+
+# Loader (and its MongoClient) created once in every worker process
+worker_loader: Optional[Loader] = None
+
+
+def init_worker() -> None:
+    """
+    Create one db connection for the worker process
+    """
+    global worker_loader
+    worker_loader = Loader()
+
+
+def load_file(
+    file_path: str,
+    batch_size: int,
+    file_workers: int = 1,
+    loader: Optional[Loader] = None,
+    pipeline: bool = False,
+) -> dict:
+    """
+    Load one file and return stats used by summary
+    """
+    loader = loader or worker_loader
+    start_time = time.perf_counter()
+    values = loader.load_file_logs(
+        file_path, batch_size=batch_size, workers=file_workers, pipeline=pipeline
+    )
+    return {
+        "file": file_path,
+        "pid": os.getpid(),
+        "lines": values[LINES_NUMBER],
+        "bytes": os.path.getsize(file_path),
+        "elapsed": time.perf_counter() - start_time,
+    }
+
+
+def is_log_file(file_path: str) -> bool:
+    """
+    Check if filename begins with any of INPUT_FILES keys
+    """
+    filename = os.path.basename(file_path)
+    return any(filename.startswith(filename_begin) for filename_begin in INPUT_FILES)
+
+
+def expand_logs_paths(paths: list[str]) -> list[str]:
+    """
+    Change list of files, globs and directories into sorted list of log files. Files from
+    directories are taken only when they match INPUT_FILES.
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for filename in os.listdir(path):
+                file_path = os.path.join(path, filename)
+                if os.path.isfile(file_path) and is_log_file(file_path):
+                    files.add(file_path)
+        else:
+            matched = glob.glob(path)
+            if not matched:
+                logging.warning("No file matches: %s", path)
+            files.update(p for p in matched if os.path.isfile(p))
+    return sorted(files)
+
+
+def load_files(
+    paths: list[str],
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE,
+    file_workers: int = 1,
+    pipeline: bool = False,
+) -> dict:
+    """
+    Load files from paths. With more than one worker files are spread over process pool. Every
+    worker has its own db connection. With more than one file worker every uncompressed file is
+    parsed in chunks by its own process pool. With pipeline every file is read, parsed and
+    written in separate stages, see Loader.load_file_logs.
+    """
+    files = expand_logs_paths(paths)
+    results: list[dict] = []
+    failed: list[str] = []
+    start_time = time.perf_counter()
+
+    if workers > 1 and len(files) > 1:
+        # fork keeps configured django settings in workers
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=init_worker,
+        ) as executor:
+            futures = {
+                executor.submit(load_file, f, batch_size, file_workers, None, pipeline): f
+                for f in files
+            }
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                    logging.info("Loaded to db file: %s", futures[future])
+                except Exception as e:
+                    failed.append(futures[future])
+                    logging.error("Can't load file %s: %s", futures[future], e)
+    else:
+        loader = Loader()
+        for file_path in files:
+            try:
+                results.append(load_file(file_path, batch_size, file_workers, loader, pipeline))
+                logging.info("Loaded to db file: %s", file_path)
+            except Exception as e:
+                failed.append(file_path)
+                logging.error("Can't load file %s: %s", file_path, e)
+
+    return summarize(results, failed, time.perf_counter() - start_time)
+
+
+def summarize(results: list[dict], failed: list[str], wall_time: float) -> dict:
+    """
+    Sum up loaded files, lines, bytes and throughput of each worker
+    """
+    workers: dict[int, dict] = {}
+    for result in results:
+        worker = workers.setdefault(result["pid"], {"files": 0, "lines": 0, "elapsed": 0.0})
+        worker["files"] += 1
+        worker["lines"] += result["lines"]
+        worker["elapsed"] += result["elapsed"]
+
+    for worker in workers.values():
+        worker["lines_per_sec"] = worker["lines"] / worker["elapsed"] if worker["elapsed"] else 0
+
+    return {
+        "files": len(results),
+        "failed": failed,
+        "lines": sum(r["lines"] for r in results),
+        "bytes": sum(r["bytes"] for r in results),
+        "wall_time": wall_time,
+        "workers": workers,
+    }
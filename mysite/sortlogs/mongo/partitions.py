@@ -0,0 +1,103 @@
+"""
+Partitions of log collections by day or month. With SORTLOGS_PARTITION loader writes every line
+to collection of its UTC day or month, like "log_nginx_example_443__2021_08_22". Catalog shows
+partitions as one log collection and queries read only partitions which overlap datetime range,
+so old logs are dropped as whole collections. Days are UTC days, the same as datetimes stored in
+db and days of rollups.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.conf import settings
+
+from .rollups import utc_naive
+from ..structure import PARTITION
+
+PARTITION_SEPARATOR = "__"
+# layout: format of name suffix
+PARTITION_FORMATS = {
+    "day": "%Y_%m_%d",
+    "month": "%Y_%m",
+}
+
+
+def get_partition_layout() -> str:
+    """
+    Layout from settings, "" when collections are not partitioned
+    """
+    layout = getattr(settings, "SORTLOGS_PARTITION", PARTITION)
+    if layout and layout not in PARTITION_FORMATS:
+        raise ValueError(
+            f"ERROR: Partition layout '{layout}' is not one of: {', '.join(PARTITION_FORMATS)}"
+        )
+    return layout
+
+
+def partition_name(collection_name: str, value: datetime, layout: str) -> str:
+    """
+    Name of partition of log collection for datetime
+    """
+    suffix = utc_naive(value).strftime(PARTITION_FORMATS[layout])
+    return f"{collection_name}{PARTITION_SEPARATOR}{suffix}"
+
+
+def next_period(start: datetime, layout: str) -> datetime:
+    """
+    Beginning of the next day or month
+    """
+    if layout == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def split_partition(name: str) -> tuple[str, Optional[tuple[datetime, datetime]]]:
+    """
+    Log collection name and period (start, end) of partition. Period is None for collection
+    without partitions.
+    """
+    collection_name, separator, suffix = name.rpartition(PARTITION_SEPARATOR)
+    if separator:
+        for layout, suffix_format in PARTITION_FORMATS.items():
+            try:
+                start = datetime.strptime(suffix, suffix_format)
+            except ValueError:
+                continue
+            return collection_name, (start, next_period(start, layout))
+    return name, None
+
+
+def overlapping_collections(
+    names: list[str], start_datetime: Optional[datetime], end_datetime: datetime
+) -> list[str]:
+    """
+    Collections of one log collection (partitions and collection itself, if it was loaded
+    without partitions) which can have logs from datetime range
+    """
+    start = utc_naive(start_datetime) if start_datetime else None
+    end = utc_naive(end_datetime)
+    selected = []
+    for name in names:
+        period = split_partition(name)[1]
+        if period is None or (period[0] <= end and (start is None or start < period[1])):
+            selected.append(name)
+    return selected
+
+
+def partition_lanes(names: list[str], newest_first: bool = False) -> list[list[str]]:
+    """
+    Split collections into lanes of partitions whose periods follow one after other. Lane is read
+    by one query after other, only lanes have to be merged. Collection without partitions and
+    partitions overlapping other ones (layout was changed) get their own lanes.
+    """
+    periods = sorted(
+        (split_partition(name)[1] or (datetime.min, datetime.max), name) for name in names
+    )
+    lanes: list[list[tuple[tuple[datetime, datetime], str]]] = []
+    for period, name in periods:
+        for lane in lanes:
+            if lane[-1][0][1] <= period[0]:
+                lane.append((period, name))
+                break
+        else:
+            lanes.append([(period, name)])
+    return [[name for _, name in (lane[::-1] if newest_first else lane)] for lane in lanes]
@@ -0,0 +1,77 @@
+"""
+Ids of log lines made from their content. The same line loaded twice gets the same id, so it is
+stored only once.
+"""
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+
+from ..structure import OCCURRENCES_WINDOW
+
+
+def line_key(collection_name: str, record_datetime: datetime, line: str) -> str:
+    """
+    Hash of collection name, datetime and the first line of the record. Continuation lines are
+    not used because they can be appended to the record later.
+    """
+    first_line = line.split("\n", 1)[0]
+    return hashlib.blake2b(
+        f"{collection_name}\0{record_datetime.isoformat()}\0{first_line}".encode(),
+        digest_size=12,
+    ).hexdigest()
+
+
+def record_id(key: str, occurrence: int) -> ObjectId:
+    """
+    Make 12 bytes id from line key and number of the same line at the same time
+    """
+    return ObjectId(hashlib.blake2b(f"{key}\0{occurrence}".encode(), digest_size=12).digest())
+
+
+class Occurrences:
+    """
+    Count the same lines with the same datetime. Identical lines (ex. health checks) get
+    different ids thanks to the count. Counts are kept for the last OCCURRENCES_WINDOW datetimes,
+    so the same line repeated after lines with other datetimes (lines written out of order) gets
+    the next count too. Counts are saved in LOADED_FILES, so the next load of growing file
+    continues counting.
+    """
+
+    def __init__(self, state: Optional[dict] = None, window: int = OCCURRENCES_WINDOW) -> None:
+        """
+        Restore counts saved by the previous load
+        """
+        state = state or {}
+        self.window = window
+        self.counts: OrderedDict[str, dict[str, int]] = OrderedDict()
+        if state.get("datetime"):
+            # state saved with counts of the last datetime only
+            self.counts[state["datetime"]] = dict(state.get("counts", {}))
+        for record_time, counts in state.get("datetimes", []):
+            self.counts[record_time] = dict(counts)
+
+    def next(self, record_datetime: datetime, key: str) -> int:
+        """
+        Return how many times line with this key was seen before with this datetime
+        """
+        record_time = record_datetime.isoformat()
+        counts = self.counts.get(record_time)
+        if counts is None:
+            counts = self.counts[record_time] = {}
+            if len(self.counts) > self.window:
+                self.counts.popitem(last=False)
+        else:
+            self.counts.move_to_end(record_time)
+        occurrence = counts.get(key, 0)
+        counts[key] = occurrence + 1
+        return occurrence
+
+    def get_state(self) -> dict:
+        """
+        Counts which can be saved in db, datetimes are not used as field names because they can
+        have dots
+        """
+        return {"datetimes": [[record_time, counts] for record_time, counts in self.counts.items()]}
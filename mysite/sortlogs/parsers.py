@@ -1,9 +1,12 @@
+from collections import OrderedDict
 from datetime import datetime
-import pytz
+import os
 import re
-from typing import Any, Optional
+from typing import Any, Callable, Iterable, Iterator, Optional
 
-from .structure import INPUT_FILES, Level, Category
+from . import timestamps
+from .readers import open_log_file
+from .structure import DATE_CACHE_SIZE, INPUT_FILES, Level, Category
 
 def choose_parser(filename: str, file_modified_date: datetime) -> Any:
     for filename_begin, matrix in INPUT_FILES.items():
@@ -29,6 +32,7 @@ def choose_parser(filename: str, file_modified_date: datetime) -> Any:
 
             elif m["category"] == Category.MAIL:
                 m["year"] = file_modified_date.year
+                m["month"] = file_modified_date.month
                 return MailParser(**m)
 
             elif m["category"] == Category.PG:
@@ -44,11 +48,34 @@ def choose_parser(filename: str, file_modified_date: datetime) -> Any:
         raise ValueError(f"ERROR: File {filename} doesn't match to any INPUT_FILES keys.")
 
 
+def parser_for_collection(collection_name: str) -> Any:
+    """
+    Find parser which puts logs to collection, None if there isn't any
+    """
+    for filename_begin in INPUT_FILES:
+        try:
+            log_parser = choose_parser(filename_begin, datetime.utcnow())
+        except ValueError:
+            continue
+        if log_parser.get_collection_name() == collection_name:
+            return log_parser
+
+
 class BaseLogParser:
     """
-    Any log parser required at least datetime_format specified.
+    Any log parser required at least datetime_format specified. Parser can have fast_date
+    function which decodes datetime_format faster than strptime.
+
+    Decoded dates are memoized. Consecutive lines usually have the same date string, so the last
+    one is checked first, then small LRU cache for lines written out of order.
     """
     datetime_format = ""
+    fast_date: Optional[Callable[[str], datetime]] = None
+    date_cache_size: int = DATE_CACHE_SIZE
+    # date of line depends on lines before it, file can't be parsed in independent chunks
+    stateful: bool = False
+    # indexes for fields from parse_fields, lists of (field, direction)
+    indexes: list[list[tuple[str, int]]] = []
 
     def __init__(self, **kwargs) -> None:
         """
@@ -58,6 +85,11 @@ class BaseLogParser:
         self.level: str = kwargs.get("level")
         self.domain: str = kwargs.get("domain")
         self.port: str = kwargs.get("port")
+        self.last_date_string: Optional[str] = None
+        self.last_date: Optional[datetime] = None
+        self.date_cache: OrderedDict[str, Optional[datetime]] = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def parse_line(self, line: str) -> Optional[datetime]:
         """
@@ -68,13 +100,58 @@ class BaseLogParser:
 
     def get_date(self, line: str) -> Optional[datetime]:
         """
-        Get date and time from string
+        Get date and time from string, memoized result is returned if the string was decoded
+        recently.
         """
+        if not self.date_cache_size:
+            return self.decode_date(line)
+
+        if line == self.last_date_string:
+            self.cache_hits += 1
+            return self.last_date
+
+        try:
+            line_datetime = self.date_cache[line]
+            self.date_cache.move_to_end(line)
+            self.cache_hits += 1
+        except KeyError:
+            line_datetime = self.decode_date(line)
+            self.date_cache[line] = line_datetime
+            if len(self.date_cache) > self.date_cache_size:
+                self.date_cache.popitem(last=False)
+            self.cache_misses += 1
+
+        self.last_date_string = line
+        self.last_date = line_datetime
+        return line_datetime
+
+    def decode_date(self, line: str) -> Optional[datetime]:
+        """
+        Get date and time from string. Use fast_date if the string has expected shape.
+        """
+        if self.fast_date is not None:
+            try:
+                return self.fast_date(line)
+            except ValueError:
+                pass
         try:
             return datetime.strptime(line, self.datetime_format)
         except ValueError as e:
             return
 
+    def cache_info(self) -> dict:
+        """
+        Hits and misses of memoized dates
+        """
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "size": len(self.date_cache)}
+
+    def parse_fields(self, line: str) -> dict:
+        """
+        Get fields from line which are stored in separate document fields. By default there
+        aren't any.
+        """
+        return {}
+
     def get_collection_name(self):
         """
         Generate collection name for logs
@@ -88,6 +165,17 @@ class NginxLogParser(BaseLogParser):
     "16/Feb/2020:06:24:23 +0000"
     """
     datetime_format = "%d/%b/%Y:%H:%M:%S %z"
+    fast_date = staticmethod(timestamps.nginx_log_time)
+    # combined log format, fields after status can be missing
+    combined_pattern = re.compile(
+        r'(?P<remote_addr>\S+) \S+ \S+ \[[^\]]*\] "(?P<request>[^"]*)" (?P<status>\d{3})'
+        r'(?: (?P<body_bytes>\d+|-))?(?: "(?P<referer>[^"]*)")?(?: "(?P<user_agent>[^"]*)")?'
+    )
+    indexes = [
+        [("status", 1), ("datetime", 1)],
+        [("path", 1), ("datetime", 1)],
+        [("remote_addr", 1), ("datetime", 1)],
+    ]
 
     # ip, _, user = line.split(" ")[:3]
     # str_time = line.split(']')[0].split('[')[1]
@@ -100,6 +188,28 @@ class NginxLogParser(BaseLogParser):
         """
         return self.get_date(re.split("[\[\]]", line, 2)[1])
 
+    def parse_fields(self, line: str) -> dict:
+        """
+        Get request fields from combined log line. Empty values ("-") are not stored.
+        """
+        match = self.combined_pattern.match(line)
+        if not match:
+            return {}
+
+        fields = {
+            "remote_addr": match["remote_addr"],
+            "status": int(match["status"]),
+        }
+        request = match["request"].split(" ", 2)
+        if len(request) == 3:
+            fields["method"], fields["path"], fields["protocol"] = request
+        if match["body_bytes"] and match["body_bytes"] != "-":
+            fields["body_bytes"] = int(match["body_bytes"])
+        for name in ("referer", "user_agent"):
+            if match[name] and match[name] != "-":
+                fields[name] = match[name]
+        return fields
+
 
 class NginxErrParser(BaseLogParser):
     """
@@ -107,6 +217,7 @@ class NginxErrParser(BaseLogParser):
     "2020/6/30 06:24:53"
     """
     datetime_format = "%Y/%m/%d %H:%M:%S"
+    fast_date = staticmethod(timestamps.nginx_err_time)
 
 
 class UwsgiParser(BaseLogParser):
@@ -115,6 +226,7 @@ class UwsgiParser(BaseLogParser):
     "Wed May 20 19:08:35 2020"
     """
     datetime_format = "%a %b %d %H:%M:%S %Y"
+    fast_date = staticmethod(timestamps.uwsgi_time)
 
     def parse_line(self, line: str) -> Optional[datetime]:
         """
@@ -139,13 +251,14 @@ class CeleryParser(BaseLogParser):
     "2019-06-03 03:41:18,934"
     """
     datetime_format = "%Y-%m-%d %H:%M:%S,%f"
+    fast_date = staticmethod(timestamps.celery_time)
 
     def parse_line(self, line:str) -> Optional[datetime]:
         """
         Parse celery logs from supervisor. Separators are `[`, `]`, `: ` (space after colon)
         [2019-06-03 03:41:18,934: ERROR/MainProcess] consumer: Cannot connect to redis://:**@localhost:6379/1:
         """
-        line_list = re.split("[\[\]|: ]", line, 2)
+        line_list = re.split(r"\[|\]|: ", line, 2)
         try:
             str_time = line_list[1]
         except IndexError:
@@ -158,15 +271,38 @@ class MailParser(BaseLogParser):
     """
     Parser for mail logs line
     "2019 Jun  4 06:36:43"
+
+    Lines without year get year inferred from file mtime and month changes. Year changes only
+    when month jumps by more than half of year from the previous line (Dec -> Jan is the next
+    year, Jan -> Dec the previous one, like in mail.err which is in reverse order). Late lines a
+    month or two back stay in the same year.
     """
     datetime_format = "%Y %b %d %H:%M:%S"
+    fast_date = staticmethod(timestamps.mail_time)
+    stateful = True
 
     def __init__(self, **kwargs):
         """
-        Year from file stat (mtime)
+        Year and month from file stat (mtime)
         """
         super().__init__(**kwargs)
         self.year = kwargs.get('year')
+        self.month = kwargs.get("month", 12)
+        self.line_year: Optional[int] = None
+        self.line_month: Optional[int] = None
+
+    def infer_year(self, month: int) -> int:
+        """
+        Year of line with month. The first line is anchored on file mtime: month after mtime
+        month is from the previous year. Next lines take year nearest to the previous line.
+        """
+        if self.line_month is None:
+            return self.year - 1 if month > self.month else self.year
+        if month < self.line_month - 6:
+            return self.line_year + 1
+        if month > self.line_month + 6:
+            return self.line_year - 1
+        return self.line_year
 
     def parse_line(self, line: str) -> Optional[datetime]:
         """
@@ -174,12 +310,22 @@ class MailParser(BaseLogParser):
         """
         # line = '2019 Jun 14 06:36:43 server postfix/smtps/smtpd[2299]: log message'
         # line = '2019 Jun  4 06:36:43 server ...'
-        # line = 'Jun 4 06:36:43 server ...'
-        if not line[:4].isdigit():
-            line = f"{self.year} {line}"
-
-        # line[:20] is '2019 Feb 23 06:24:09'
-        return self.get_date(line[:20])
+        # line = 'Jun  4 06:36:43 server ...'
+        if line[:4].isdigit():
+            # line[:20] is '2019 Feb 23 06:24:09'
+            line_datetime = self.get_date(line[:20])
+            if line_datetime:
+                self.line_year, self.line_month = line_datetime.year, line_datetime.month
+            return line_datetime
+
+        month = timestamps.MONTHS.get(line[:3])
+        if month is None:
+            return None
+        year = self.infer_year(month)
+        line_datetime = self.get_date(f"{year} {line[:15]}")
+        if line_datetime:
+            self.line_year, self.line_month = year, month
+        return line_datetime
 
 
 class PostgresParser(BaseLogParser):
@@ -188,6 +334,7 @@ class PostgresParser(BaseLogParser):
     "2021-09-02 17:23:40.866 UTC"
     """
     datetime_format = "%Y-%m-%d %H:%M:%S.%f %Z"
+    fast_date = staticmethod(timestamps.postgres_time)
 
     def parse_line(self, line: str) -> Optional[datetime]:
         """
@@ -202,6 +349,7 @@ class RedisParser(BaseLogParser):
     "28 Aug 2022 00:01:00.138"
     """
     datetime_format = "%d %b %Y %H:%M:%S.%f"
+    fast_date = staticmethod(timestamps.redis_time)
 
     def parse_line(self, line: str) -> Optional[datetime]:
         """
@@ -216,6 +364,7 @@ class SupervisordParser(BaseLogParser):
     Datetime string example: "2021-09-09 21:23:43,286"
     """
     datetime_format = "%Y-%m-%d %H:%M:%S,%f"
+    fast_date = staticmethod(timestamps.celery_time)
 
 
 class LogLine:
@@ -226,13 +375,9 @@ class LogLine:
     cache: bool = False
     has_date: bool = False
     update: bool = False
-    key: str = ""
-    key_date: str = ""
-    log_time: str = ""
     line: str = ""
     line_update: Optional[str] = None
     datetime: Optional[datetime] = None
-    inserted_id = None
 
     def __init__(self, log_parser: Any) -> None:
         """
@@ -242,7 +387,7 @@ class LogLine:
 
     def set_line(self, line: str) -> None:
         """
-        Set self.datetime, self.key_date and self.log_time for this log_line
+        Set self.datetime and self.line for this log_line
         """
         line_datetime = self.parse_line(line)
         if line_datetime:
@@ -260,14 +405,88 @@ class LogLine:
                 self.line_update = "".join((self.line_update, line))
             self.has_date = False
 
-    def correct_datetime(self) -> None:
+    def pop_update(self) -> str:
+        """
+        Return line with continuation lines and clear cached values
+        """
+        line_update = self.line_update
+        self.line_update = None
+        self.update = False
+        self.cache = False
+        return line_update
+
+
+class RecordsBuilder:
+    """
+    Build records from lines pushed one by one. Every record starts with line with date and
+    includes continuation lines (lines without date) which follow it. Lines without date that
+    don't follow any line with date make record with datetime None.
+    """
+
+    def __init__(self, log_parser: Any) -> None:
+        """
+        Start with empty record
+        """
+        self.log_parser = log_parser
+        self.log_line = LogLine(log_parser)
+        self.record: dict = {"datetime": None, "line": ""}
+
+    def push(self, line: str) -> Optional[dict]:
+        """
+        Add line. Return the previous record when the line starts the new one.
+        """
+        finished = None
+        self.log_line.set_line(line)
+        if self.log_line.update:
+            self.record["line"] = self.log_line.pop_update()
+
+        if self.log_line.has_date:
+            if self.record["line"]:
+                finished = self.record
+            self.record = {"datetime": self.log_line.datetime, "line": self.log_line.line}
+            self.record.update(self.log_parser.parse_fields(self.log_line.line))
+        return finished
+
+    def pop(self) -> Optional[dict]:
         """
-        Some log rows have time in local timezone. Change it to UTC
+        Return record which is being built now. Next continuation lines will make record with
+        datetime None.
         """
-        self.datetime = pytz.timezone("UTC").localize(self.datetime)
-        warsaw_zone = pytz.timezone("Europe/Warsaw")
-        self.key_date = self.datetime.astimezone(warsaw_zone).strftime("%Y-%m-%d")
-        self.log_time = self.datetime.astimezone(warsaw_zone).strftime("%H:%M:%S")
-        if not self.key.endswith(self.key_date):
-            # change key if needed
-            self.key = "_".join(self.key.split("_")[:-1] + [self.key_date])
+        if self.log_line.cache:
+            self.record["line"] = self.log_line.pop_update()
+        record = self.record if self.record["line"] else None
+        self.record = {"datetime": None, "line": ""}
+        self.log_line.line = ""
+        return record
+
+
+def iter_lines_records(lines: Iterable[str], log_parser: Any) -> Iterator[dict]:
+    """
+    Group lines into records. Record is yielded when it is finished, so only one record is kept in
+    memory. Lines from the beginning before any line with date are yielded as record with
+    datetime None.
+    """
+    builder = RecordsBuilder(log_parser)
+    for line in lines:
+        record = builder.push(line)
+        if record:
+            yield record
+
+    record = builder.pop()
+    if record:
+        yield record
+
+
+def iter_records(file_path: str, log_parser: Any = None) -> Iterator[dict]:
+    """
+    Stream records from log file (plain or gzipped) line by line. Parser is chosen by filename if
+    not given. Lines before the first line with date are skipped.
+    """
+    if log_parser is None:
+        file_modified_date = datetime.utcfromtimestamp(os.stat(file_path).st_mtime)
+        log_parser = choose_parser(os.path.basename(file_path), file_modified_date)
+
+    with open_log_file(file_path) as f:
+        for record in iter_lines_records(f, log_parser):
+            if record["datetime"] is not None:
+                yield record
@@ -0,0 +1,157 @@
+"""
+Stages of file loading joined by bounded queues: reader thread (decompression and decoding),
+parser (calling thread) and writer thread (db). Decompression and waits for db release the GIL,
+so they overlap with parsing instead of adding to it.
+"""
+import queue
+import threading
+from itertools import chain
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from .readers import iter_block_lines, iter_blocks
+from .structure import PIPELINE_QUEUE_SIZE
+
+# end of items in queue
+STOP = object()
+
+
+class ThreadedIterator:
+    """
+    Run iterator in its own thread and pass its items through bounded queue. Error raised in the
+    thread is raised again in consumer. When consumer stops early, the thread stops too.
+    """
+
+    def __init__(self, items: Iterable, queue_size: int = PIPELINE_QUEUE_SIZE) -> None:
+        """
+        Start thread which takes items
+        """
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.stopped = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self.produce, args=(items,), daemon=True)
+        self.thread.start()
+
+    def produce(self, items: Iterable) -> None:
+        """
+        Put items to queue until they end or consumer stops
+        """
+        try:
+            for item in items:
+                if not self.put(item):
+                    return
+        except BaseException as e:
+            self.error = e
+        self.put(STOP)
+
+    def put(self, item: Any) -> bool:
+        """
+        Wait for free place in queue, return False when consumer stopped
+        """
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self) -> Iterator:
+        """
+        Yield items taken by the thread
+        """
+        try:
+            while (item := self.queue.get()) is not STOP:
+                yield item
+            if self.error:
+                raise self.error
+        finally:
+            self.stopped.set()
+
+    def close(self) -> None:
+        """
+        Stop the thread
+        """
+        self.stopped.set()
+        self.thread.join()
+
+
+class ThreadedLines:
+    """
+    Lines of log file (also compressed) read and decoded in reader thread. It is used like open
+    file.
+    """
+
+    def __init__(self, file_path: str, queue_size: int = PIPELINE_QUEUE_SIZE) -> None:
+        """
+        Start reading file
+        """
+        self.blocks = ThreadedIterator(iter_block_lines(iter_blocks(file_path)), queue_size)
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Yield lines one by one
+        """
+        return chain.from_iterable(self.blocks)
+
+    def __enter__(self) -> "ThreadedLines":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.blocks.close()
+
+
+class BatchWriter:
+    """
+    Write batches of records in writer thread. Parser can prepare the next batch while the
+    previous one is sent to db. The first error stops writing and is raised by submit or close.
+    """
+
+    def __init__(self, write: Callable[[list], Any], queue_size: int = PIPELINE_QUEUE_SIZE):
+        """
+        Start thread which calls write for every submitted batch
+        """
+        self.write = write
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self.consume, daemon=True)
+        self.thread.start()
+
+    def consume(self) -> None:
+        """
+        Write batches until STOP, after error the rest is only taken from queue
+        """
+        while (batch := self.queue.get()) is not STOP:
+            if self.error:
+                continue
+            try:
+                self.write(batch)
+            except BaseException as e:
+                self.error = e
+
+    def submit(self, batch: list) -> None:
+        """
+        Queue batch for writing, wait when queue is full
+        """
+        if self.error:
+            raise self.error
+        self.queue.put(batch)
+
+    def close(self) -> None:
+        """
+        Wait for queued batches to be written
+        """
+        self.queue.put(STOP)
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # error in parser, batches written so far are kept
+            self.queue.put(STOP)
+            self.thread.join()
@@ -0,0 +1,170 @@
+"""
+Read log files line by line, plain text or compressed rotations
+"""
+import bz2
+import gzip
+import hashlib
+import io
+import lzma
+import os
+import re
+import zlib
+from typing import IO, Iterable, Iterator
+
+from .structure import FINGERPRINT_SIZE, READ_BUFFER_SIZE
+
+try:
+    import zstandard
+except ImportError:  # optional, needed only for .zst rotations
+    zstandard = None
+
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".xz", ".zst")
+GZIP_WBITS = zlib.MAX_WBITS | 16  # zlib reads gzip header and trailer
+# rotated file suffix like .1 or -20200220, nothing is written to rotated file anymore
+ROTATED_SUFFIX = re.compile(r"[.-]\d+$")
+
+
+def is_compressed(file_path: str) -> bool:
+    """
+    Check if file is compressed rotation by its extension
+    """
+    return str(file_path).endswith(COMPRESSED_EXTENSIONS)
+
+
+def is_rotated_file(file_path: str) -> bool:
+    """
+    Check if file is rotation by its name, compressed or with rotated suffix
+    """
+    return is_compressed(file_path) or bool(ROTATED_SUFFIX.search(str(file_path)))
+
+
+def open_zstd(file_path: str, mode: str = "rt") -> IO:
+    """
+    Open zstandard compressed file, all frames of the file are read
+    """
+    if zstandard is None:
+        raise ValueError(f"ERROR: Package zstandard is required to read {file_path}")
+    reader = zstandard.ZstdDecompressor().stream_reader(
+        open(file_path, "rb"), read_across_frames=True, closefd=True
+    )
+    if "t" in mode:
+        return io.TextIOWrapper(reader)
+    return io.BufferedReader(reader)
+
+
+OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open, ".zst": open_zstd}
+
+
+def open_log_file(file_path: str, mode: str = "rt") -> IO:
+    """
+    Open log file with function chosen by file extension. The file is read lazily so memory does
+    not grow with file size.
+    """
+    function_open = OPENERS.get(os.path.splitext(str(file_path))[1], open)
+    return function_open(file_path, mode)
+
+
+def iter_blocks(file_path: str, size: int = READ_BUFFER_SIZE) -> Iterator[bytes]:
+    """
+    Read file as big blocks of uncompressed bytes, block is never bigger than size. Gzip is
+    decompressed by zlib directly, highly compressed data is decompressed in many calls with
+    limited output. Members of gzip file are read one after another like gzip.open does.
+    """
+    if not str(file_path).endswith(".gz"):
+        with open_log_file(file_path, "rb") as f:
+            while block := f.read(size):
+                yield block
+        return
+
+    with open(file_path, "rb") as f:
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        member_started = False
+        while compressed := f.read(size):
+            # output limit was reached, decompressor can have more output without new input
+            pending = False
+            while compressed or pending:
+                member_started = True
+                block = decompressor.decompress(compressed, size)
+                if block:
+                    yield block
+                pending = len(block) == size
+                compressed = decompressor.unconsumed_tail
+                if decompressor.eof:
+                    compressed = decompressor.unused_data
+                    decompressor = zlib.decompressobj(GZIP_WBITS)
+                    member_started = pending = False
+        if member_started and not decompressor.eof:
+            raise EOFError(f"Compressed file {file_path} ended before the end-of-stream marker")
+
+
+def iter_block_lines(blocks: Iterable[bytes]) -> Iterator[list[str]]:
+    """
+    Split blocks into lists of decoded lines. Block is cut after its last new line char, the
+    rest goes to the next block, so multibyte chars are never split.
+    """
+    rest = b""
+    for block in blocks:
+        if rest:
+            block = rest + block
+        end = block.rfind(b"\n") + 1
+        rest = block[end:]
+        if end:
+            # only "\n" ends lines like in binary file iteration
+            yield list(io.StringIO(block[:end].decode(), newline="\n"))
+    if rest:
+        yield [rest.decode()]
+
+
+def file_fingerprint(file_path: str, size: int = FINGERPRINT_SIZE) -> str:
+    """
+    Hash of the first bytes of the file. It shows if file at the same path still has the same
+    content at the beginning or if it was rotated.
+    """
+    with open(file_path, "rb") as f:
+        return hashlib.sha1(f.read(size)).hexdigest()
+
+
+def complete_lines_end(file_path: str, size: int, block_size: int = READ_BUFFER_SIZE) -> int:
+    """
+    Offset after the last new line char in the first size bytes of file, 0 when there is none
+    """
+    with open(file_path, "rb") as f:
+        end = size
+        while end > 0:
+            start = max(end - block_size, 0)
+            f.seek(start)
+            position = f.read(end - start).rfind(b"\n")
+            if position >= 0:
+                return start + position + 1
+            end = start
+    return 0
+
+
+class OffsetLines:
+    """
+    Iterate over lines of uncompressed file from byte offset. After iteration offset points to
+    the end of the last line taken, so the next run can start from there. With hold_tail the last
+    line without new line char is not taken because it can be still written, it is taken from
+    finished (rotated) file.
+    """
+
+    def __init__(self, f: IO[bytes], offset: int = 0, hold_tail: bool = True) -> None:
+        """
+        Set binary file and move it to offset
+        """
+        self.f = f
+        self.offset = offset
+        self.hold_tail = hold_tail
+        self.lines_number = 0
+        f.seek(offset)
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Yield decoded lines and count bytes
+        """
+        for line in self.f:
+            if self.hold_tail and not line.endswith(b"\n"):
+                break
+            self.offset += len(line)
+            self.lines_number += 1
+            yield line.decode()
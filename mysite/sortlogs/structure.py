@@ -2,12 +2,36 @@
 This module is some kind of project confing
 """
 LOADED_FILES = "a_loaded_files"
+ROLLUPS = "a_rollups"  # counts of log lines per minute, hour and day
+CATALOG = "a_catalog"  # version of log collections, it is changed by every load
 # keys for BASE_KEY hash
 FIRST_LOG_TIME = "first_log_time"  # time of the first log in the key
 LAST_LOG_TIME = "last_log_time"  # time of the last log in the key
 LINES_NUMBER = "lines_number"  # how many log lines has the key
 COLLECTION_NAME = "collection_name"  # where logs were put in
+INODE = "inode"  # inode of loaded file
+FILE_SIZE = "file_size"  # size of loaded file in bytes
+OFFSET = "offset"  # bytes of the file loaded so far, next load starts from here
+FINGERPRINT = "fingerprint"  # hash of the first bytes of loaded file
+LAST_RECORD_ID = "last_record_id"  # last log line inserted by load, continuation lines go there
+OCCURRENCES = "occurrences"  # counts of repeated lines with the last datetimes, part of line id
 TIME_RANGE_DAYS = 1  # range in days for log (now - TIME_RANGE_DAYS)
+CATALOG_TTL = 60.0  # seconds catalog of log collections is used without checking its version
+PARTITION = ""  # log collections partitioned by "day" or "month", "" is one collection
+BATCH_SIZE = 1000  # how many log lines are sent to db in one bulk write
+CHUNK_SIZE = 64 * 1024 * 1024  # bytes of big log file parsed by one worker at once
+DATE_CACHE_SIZE = 256  # how many decoded date strings every parser remembers
+OCCURRENCES_WINDOW = 256  # how many last datetimes have counts of repeated lines
+FINGERPRINT_SIZE = 1024  # bytes from the beginning of file used to detect rotation
+FLUSH_INTERVAL = 5.0  # max seconds followed lines wait for write to db
+POLL_INTERVAL = 1.0  # seconds between checks for new lines in followed file
+READ_BUFFER_SIZE = 1024 * 1024  # bytes read (and decompressed) at once by pipeline reader
+MAX_LINE_TOKENS = 100  # how many tokens of every line of record are indexed for search
+MAX_PAGE_SIZE = 1000  # max log lines shown on one page of search
+MAX_VOLUME_DAYS = 366  # max range in days of volume graph
+EXPORT_BATCH_SIZE = 1000  # log lines fetched from db at once by export
+EXPORT_CHUNK_SIZE = 64 * 1024  # bytes of exported logs sent to client at once
+PIPELINE_QUEUE_SIZE = 8  # blocks of lines or batches of records waiting between pipeline stages
 
 
 class BasicStructure:
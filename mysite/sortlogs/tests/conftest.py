@@ -36,6 +36,24 @@ def create_logs_file():
             f.write(example_com_data)
 
 
+uwsgi_data = """*** Starting uWSGI 2.0.18 (64bit) on [Wed May 20 19:08:35 2020] ***
+compiled with version: 8.3.0 on 20 May 2020 19:02:11
+[pid: 28593|app: 0|req: 1/1] 1.2.3.4 () {52 vars} [Wed May 20 22:36:02 2020] GET / => 200
+Traceback (most recent call last):
+  File "views.py", line 1, in get
+ValueError: example
+[pid: 28593|app: 0|req: 2/2] 1.2.3.4 () {52 vars} [Wed May 20 22:36:05 2020] GET /pl => 200
+"""
+
+
+@pytest.fixture
+def create_uwsgi_logs_file():
+    file_path = Path("mysite/sortlogs/tests/fixtures/example-com-stdout---supervisor.log.0")
+    if not file_path.exists():
+        with open(file_path, "wt") as f:
+            f.write(uwsgi_data)
+
+
 @pytest.fixture
 def create_input_data_mongo(mongodb):
     mongodb.log_nginx_example_443.insert_many([{
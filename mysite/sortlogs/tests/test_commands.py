@@ -1,11 +1,26 @@
+import bz2
+import gzip
+import lzma
+from datetime import datetime
+
 import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
 
-from .conftest import example_com_data
-from ..mongo.logs_load import Loader
+from .conftest import example_com_data, uwsgi_data
+from ..mongo import clients
+from ..mongo.catalog import CollectionCatalog
+from ..mongo.follow import FollowedFile
+from ..mongo.indexes import DATETIME_INDEX
+from ..mongo.logs_load import Loader, LogsFromDb
+from ..mongo.parallel import load_files
+from ..mongo.partitions import partition_lanes
+from ..structure import LINES_NUMBER, OFFSET
 
 
 @pytest.mark.django_db
-def test_load_file_logs(create_logs_file):
+def test_load_file_logs(mongodb, create_logs_file):
     """
     Test Loader.load_file_logs method which is main method for load_logs command
     """
@@ -17,3 +32,353 @@ def test_load_file_logs(create_logs_file):
     result = "".join(d["line"] for d in collection.find())
 
     assert result == example_com_data
+
+
+@pytest.mark.django_db
+def test_load_file_logs_batches(mongodb, create_uwsgi_logs_file):
+    """
+    Continuation lines have to be merged into pending record when lines are sent in batches
+    """
+    filename = "mysite/sortlogs/tests/fixtures/example-com-stdout---supervisor.log.0"
+    loader = Loader()
+    loader.load_file_logs(filename, batch_size=2)
+
+    collection = loader.db.get_collection("log_uwsgi_example_")
+    lines = [d["line"] for d in collection.find()]
+
+    assert len(lines) == 3
+    assert "".join(lines) == uwsgi_data
+
+
+@pytest.mark.django_db
+def test_load_files(mongodb, create_logs_file, create_uwsgi_logs_file):
+    """
+    Test loading all log files from directory with summary, command needs files
+    """
+    summary = load_files(["mysite/sortlogs/tests/fixtures"])
+
+    assert summary["files"] == 2
+    assert summary["lines"] == 10
+    assert summary["failed"] == []
+
+    with pytest.raises(CommandError):
+        call_command("logs_load")
+
+
+@pytest.mark.django_db
+def test_load_file_logs_resume(mongodb, tmp_path):
+    """
+    Second load of growing file adds only new lines, continuation lines go to the last record
+    """
+    file_path = tmp_path / "example-com-stdout---supervisor.log"
+    lines = uwsgi_data.splitlines(keepends=True)
+    file_path.write_text("".join(lines[:4]))
+    loader = Loader()
+    loader.load_file_logs(str(file_path))
+
+    with open(file_path, "at") as f:
+        f.write("".join(lines[4:]))
+    values = loader.load_file_logs(str(file_path))
+
+    collection = loader.db.get_collection("log_uwsgi_example_")
+    result = [d["line"] for d in collection.find()]
+
+    assert values[LINES_NUMBER] == 3
+    assert len(result) == 3
+    assert "".join(result) == uwsgi_data
+    assert loader.get_file_collections(file_path.name)[LINES_NUMBER] == 7
+
+
+@pytest.mark.django_db
+def test_resume_after_record_loaded_before(mongodb, tmp_path):
+    """
+    Continuation lines are not appended to record which was loaded complete from other file
+    """
+    (tmp_path / "example-com-stdout---supervisor.log.1").write_text(uwsgi_data)
+    file_path = tmp_path / "example-com-stdout---supervisor.log"
+    lines = uwsgi_data.splitlines(keepends=True)
+    file_path.write_text("".join(lines[:4]))
+    loader = Loader()
+    loader.load_file_logs(str(tmp_path / "example-com-stdout---supervisor.log.1"))
+    loader.load_file_logs(str(file_path))
+
+    with open(file_path, "at") as f:
+        f.write("".join(lines[4:]))
+    loader.load_file_logs(str(file_path))
+
+    collection = loader.db.get_collection("log_uwsgi_example_")
+    result = [d["line"] for d in collection.find()]
+
+    assert len(result) == 3
+    assert "".join(result) == uwsgi_data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("suffix, lines_number", [("", 2), (".1", 3)])
+def test_load_unterminated_last_line(mongodb, tmp_path, workers, suffix, lines_number):
+    """
+    The last line without new line char is loaded from rotated file, live file keeps it for the
+    next load
+    """
+    file_path = tmp_path / f"example.com-80-access.log{suffix}"
+    data = example_com_data.rstrip("\n")
+    file_path.write_text(data)
+    loader = Loader()
+    values = loader.load_file_logs(str(file_path), workers=workers)
+
+    collection = loader.db.get_collection("log_nginx_example_80")
+    offset = len(data) if suffix else data.rfind("\n") + 1
+
+    assert values[LINES_NUMBER] == lines_number
+    assert collection.count_documents({}) == lines_number
+    assert loader.get_file_collections(file_path.name)[OFFSET] == offset
+
+
+@pytest.mark.django_db
+def test_followed_file_poll(mongodb, tmp_path):
+    """
+    Followed file writes new lines at every poll and continues after rotation
+    """
+    file_path = tmp_path / "example-com-stdout---supervisor.log"
+    lines = uwsgi_data.splitlines(keepends=True)
+    file_path.write_text("".join(lines[:4]))
+    loader = Loader()
+    followed_file = FollowedFile(loader, str(file_path), batch_size=100, flush_interval=0)
+    followed_file.poll()
+
+    with open(file_path, "at") as f:
+        f.write("".join(lines[4:6]))
+    followed_file.poll()
+
+    file_path.rename(tmp_path / "example-com-stdout---supervisor.log.1")
+    file_path.write_text(lines[6])
+    followed_file.poll()
+
+    collection = loader.db.get_collection("log_uwsgi_example_")
+    result = [d["line"] for d in collection.find()]
+
+    assert len(result) == 3
+    assert "".join(result) == uwsgi_data
+
+
+@pytest.mark.django_db
+def test_load_file_logs_twice(mongodb, tmp_path):
+    """
+    The same lines loaded from copy of the file are not duplicated
+    """
+    data = example_com_data + example_com_data.splitlines(keepends=True)[-1]
+    for filename in ("example.com-80-access.log.1", "example.com-80-access.log.2"):
+        (tmp_path / filename).write_text(data)
+        Loader().load_file_logs(str(tmp_path / filename))
+
+    collection = Loader().db.get_collection("log_nginx_example_80")
+    result = "".join(d["line"] for d in collection.find().sort("datetime", 1))
+
+    # the same line repeated in one second is stored twice
+    assert result == data
+
+
+@pytest.mark.django_db
+def test_load_repeated_lines_out_of_order(mongodb, tmp_path):
+    """
+    The same line with the same datetime is stored every time also when lines with other
+    datetimes are between, counts survive the next load of growing file
+    """
+    line_a, line_b = example_com_data.splitlines(keepends=True)[:2]
+    file_path = tmp_path / "example.com-80-access.log"
+    file_path.write_text(line_a + line_b + line_a)
+    Loader().load_file_logs(str(file_path))
+    Loader().load_file_logs(str(file_path))
+    with open(file_path, "at") as f:
+        f.write(line_a)
+    Loader().load_file_logs(str(file_path))
+
+    collection = Loader().db.get_collection("log_nginx_example_80")
+    result = [d["line"] for d in collection.find().sort("datetime", 1)]
+
+    assert result == [line_a, line_a, line_a, line_b]
+
+
+def compress_zstd(data: bytes) -> bytes:
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "extension, compress",
+    [
+        # two gzip members like in file made by appending to .gz
+        (".gz", lambda data: gzip.compress(data[:100]) + gzip.compress(data[100:])),
+        (".bz2", bz2.compress),
+        (".xz", lzma.compress),
+        (".zst", compress_zstd),
+    ],
+)
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_load_compressed_file_logs(mongodb, tmp_path, extension, compress, pipeline):
+    """
+    Compressed rotations are loaded with and without reader and writer threads
+    """
+    file_path = tmp_path / f"example-com-stdout---supervisor.log.1{extension}"
+    file_path.write_bytes(compress(uwsgi_data.encode()))
+    loader = Loader()
+    values = loader.load_file_logs(str(file_path), batch_size=2, pipeline=pipeline)
+
+    collection = loader.db.get_collection("log_uwsgi_example_")
+    result = [d["line"] for d in collection.find().sort("datetime", 1)]
+
+    assert values[LINES_NUMBER] == 7
+    assert "".join(result) == uwsgi_data
+
+
+@pytest.mark.django_db
+def test_indexes_command(mongodb, create_logs_file):
+    """
+    Loader creates indexes, index dropped later is found by validate and created by build
+    """
+    loader = Loader()
+    loader.load_file_logs("mysite/sortlogs/tests/fixtures/example.com-80-access.log.0")
+    collection = loader.db.get_collection("log_nginx_example_80")
+    keys = [list(info["key"]) for info in collection.index_information().values()]
+
+    assert DATETIME_INDEX in keys
+    assert [("status", 1), ("datetime", 1)] in keys
+    call_command("indexes", "validate")
+
+    collection.drop_index(DATETIME_INDEX)
+    with pytest.raises(CommandError):
+        call_command("indexes", "validate")
+    call_command("indexes", "build")
+    call_command("indexes", "validate")
+
+
+@pytest.mark.django_db
+def test_search_by_tokens(mongodb, create_uwsgi_logs_file):
+    """
+    Lines are found by tokens from any of their lines, also continuation lines. Tokens are added
+    to lines loaded without them.
+    """
+    loader = Loader()
+    loader.load_file_logs("mysite/sortlogs/tests/fixtures/example-com-stdout---supervisor.log.0")
+    collection = loader.db.get_collection("log_uwsgi_example_")
+
+    def find_lines(contains):
+        query = LogsFromDb.fields_filter(contains=contains)
+        return [d["line"].split(" ", 1)[0] for d in collection.find(query).sort("datetime", 1)]
+
+    assert find_lines("valueerror") == ["[pid:"]
+    assert find_lines("1.2.3.4 GET /pl") == ["[pid:"]
+    assert find_lines("1.2.3.4 GET") == ["[pid:", "[pid:"]
+    assert find_lines("uWSGI 2.0.18") == ["***"]
+    assert find_lines("POST") == []
+
+    # lines loaded before they got tokens
+    collection.update_many({}, {"$unset": {"tokens": ""}})
+    assert find_lines("valueerror") == []
+    call_command("indexes", "tokens")
+    assert find_lines("valueerror") == ["[pid:"]
+
+
+@pytest.mark.django_db
+def test_search_deep_in_traceback(mongodb, tmp_path):
+    """
+    Words from the end of long traceback are found, the same when traceback was loaded with its
+    first line and when it was appended to it by the next load
+    """
+    first_line = "[pid: 28593|app: 0|req: 1/1] 1.2.3.4 () {52 vars} [Wed May 20 22:36:0%d 2020]\n"
+    traceback = "".join(f'  File "module{i}.py", line {i}, in function{i}\n' for i in range(100))
+    traceback += "ValueError: deepword\n"
+    loaded_at_once = tmp_path / "example-com-stdout---supervisor.log.1"
+    loaded_at_once.write_text(first_line % 1 + traceback)
+    Loader().load_file_logs(str(loaded_at_once))
+    appended = tmp_path / "example-com-stdout---supervisor.log"
+    appended.write_text(first_line % 2)
+    Loader().load_file_logs(str(appended))
+    with open(appended, "at") as f:
+        f.write(traceback)
+    Loader().load_file_logs(str(appended))
+
+    collection = Loader().db.get_collection("log_uwsgi_example_")
+    records = list(collection.find(LogsFromDb.fields_filter(contains="deepword function99")))
+
+    assert len(records) == 2
+    # tokens differ only by time of the first line
+    assert set(records[0]["tokens"]) ^ set(records[1]["tokens"]) == {"22:36:01", "22:36:02"}
+
+
+@pytest.mark.django_db
+def test_collection_catalog(mongodb, create_logs_file, create_uwsgi_logs_file):
+    """
+    Cached catalog is built again after load changes version
+    """
+    loader = Loader()
+    collection_catalog = CollectionCatalog(ttl=0.001)
+    loader.load_file_logs("mysite/sortlogs/tests/fixtures/example.com-80-access.log.0")
+    tables = collection_catalog.get(loader.db)
+
+    assert list(tables) == ["log_nginx_example_80"]
+    assert tables["log_nginx_example_80"]["count"] == 3
+    assert tables["log_nginx_example_80"]["files"] == 1
+
+    loader.db.create_collection("log_celery_example_")
+    assert collection_catalog.get(loader.db) is tables
+
+    loader.load_file_logs("mysite/sortlogs/tests/fixtures/example-com-stdout---supervisor.log.0")
+    assert list(collection_catalog.get(loader.db)) == [
+        "log_celery_example_",
+        "log_nginx_example_80",
+        "log_uwsgi_example_",
+    ]
+
+
+@pytest.mark.django_db
+def test_partitioned_collections(mongodb, create_logs_file):
+    """
+    Lines are written to partitions of their days, queries read only partitions of datetime range
+    and old partitions are dropped as whole collections
+    """
+    loader = Loader(partition="day")
+    loader.load_file_logs("mysite/sortlogs/tests/fixtures/example.com-80-access.log.0")
+    logs_from_db = LogsFromDb()
+    entry = logs_from_db.get_catalog()["log_nginx_example_80"]
+    partitions = [
+        "log_nginx_example_80__2020_11_17",
+        "log_nginx_example_80__2020_11_18",
+        "log_nginx_example_80__2020_11_20",
+    ]
+
+    assert entry["collections"] == partitions and entry["count"] == 3
+    keys = [list(info["key"]) for info in loader.db[partitions[0]].index_information().values()]
+    assert [("status", 1), ("datetime", 1)] in keys
+    end = datetime(2020, 11, 30)
+    collections = logs_from_db.get_collections("log_nginx_example_80", datetime(2020, 11, 18), end)
+    assert collections == partitions[1:]
+    logs = logs_from_db.get_logs("log_nginx_example_80", None, end, 0)
+    assert [r["line"].split(" ")[0] for r in logs] == ["5.6.7.8", "5.6.7.8", "4.4.5.5"]
+    logs = logs_from_db.get_logs("log_nginx_example_80", None, end, 2, newest_first=True)
+    assert [r["line"].split(" ")[0] for r in logs] == ["4.4.5.5", "5.6.7.8"]
+    page = logs_from_db.get_logs_page("log_nginx_example_80", None, end, 2)
+    assert len(page["logs"]) == 2 and page["next"] is not None
+    assert partition_lanes(["x__2020_11_18", "x__2020_11_17", "x__2020_11", "x"]) == [
+        ["x"],
+        ["x__2020_11"],
+        ["x__2020_11_17", "x__2020_11_18"],
+    ]
+
+    assert loader.drop_partitions("log_nginx_example_80", datetime(2020, 11, 19)) == partitions[:2]
+    assert logs_from_db.get_catalog()["log_nginx_example_80"]["count"] == 1
+
+
+def test_shared_client():
+    """
+    Db objects share one client, after fork the client is created again
+    """
+    client = clients.get_client()
+
+    assert Loader().db.client is client
+    assert list(clients.clients) == [settings.MONGODB_URI]
+    clients.forget_clients()
+    assert clients.clients == {}
+    assert clients.get_client() is not None
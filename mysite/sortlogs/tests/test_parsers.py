@@ -0,0 +1,251 @@
+from datetime import datetime, timedelta
+import gzip
+import random
+
+import pytest
+
+from .conftest import uwsgi_data
+from ..chunks import ChunkedRecords
+from ..parsers import (
+    CeleryParser,
+    MailParser,
+    NginxErrParser,
+    NginxLogParser,
+    PostgresParser,
+    RedisParser,
+    SupervisordParser,
+    UwsgiParser,
+    iter_lines_records,
+    iter_records,
+)
+from ..readers import iter_blocks
+from ..structure import Level
+
+FAST_DATE_PARSERS = [
+    CeleryParser,
+    MailParser,
+    NginxErrParser,
+    NginxLogParser,
+    PostgresParser,
+    RedisParser,
+    SupervisordParser,
+    UwsgiParser,
+]
+EDGE_DATE_STRINGS = [
+    "",
+    "garbage",
+    "16/Feb/2020:06:24:23 +0000",
+    "16/feb/2020:06:24:23 +0000",
+    " 6/Feb/2020:06:24:23 -0130",
+    "31/Feb/2020:06:24:23 +0000",
+    "16/Feb/2020:24:00:00 +0000",
+    "16/Feb/2020:06:24:23 +00:00",
+    "16/Feb/2020:06:24:23 +2400",
+    "2020/06/30 06:24:53",
+    "2020/6/30 06:24:53",
+    "2020/00/30 06:24:53",
+    "Wed May 20 19:08:35 2020",
+    "Wed May  5 19:08:35 2020",
+    "wed may 05 19:08:35 2020",
+    "Xyz May 05 19:08:35 2020",
+    "2019-06-03 03:41:18,934",
+    "2019-06-03 03:41:18,9",
+    "2019-06-03 03:41:18,1234567",
+    "2019-06-03 03:41:18,",
+    "2019-06-03 03:41:1_,934",
+    "2021-09-02 17:23:40.866 UTC",
+    "2021-09-02 17:23:40.866 GMT",
+    "2021-09-02 17:23:40.866 CET",
+    "28 Aug 2022 00:01:00.138",
+    " 8 Aug 2022 00:01:00.138",
+    "2019 Jun  4 06:36:43",
+    "2019 Jun 14 06:36:43",
+    "2019 Jun 4 06:36:43 ",
+    "+019 Jun 14 06:36:43",
+    "2019 Jun 14 06:36:60",
+]
+
+
+def strptime_or_none(text: str, datetime_format: str):
+    try:
+        return datetime.strptime(text, datetime_format)
+    except ValueError:
+        return None
+
+
+def fast_date_or_none(parser, text: str):
+    try:
+        return parser.fast_date(text)
+    except ValueError:
+        return None
+
+
+def random_date_string(rnd: random.Random, datetime_format: str) -> str:
+    """
+    Format random datetime with parser format, %z, %Z and %f are formatted with random values
+    """
+    dt = datetime(1990, 1, 1) + timedelta(
+        seconds=rnd.randrange(50 * 365 * 86400), microseconds=rnd.randrange(1000000)
+    )
+    offset = rnd.randrange(-14 * 60, 14 * 60 + 1, 15)
+    sign = "-" if offset < 0 else "+"
+    datetime_format = (
+        datetime_format.replace("%z", f"{sign}{abs(offset) // 60:02d}{abs(offset) % 60:02d}")
+        .replace("%Z", rnd.choice(["UTC", "GMT"]))
+        .replace("%f", f"{dt.microsecond:06d}"[: rnd.randint(1, 6)])
+    )
+    return dt.strftime(datetime_format)
+
+
+def test_iter_records(create_uwsgi_logs_file):
+    """
+    Test streaming records from file with continuation lines folded into records
+    """
+    filename = "mysite/sortlogs/tests/fixtures/example-com-stdout---supervisor.log.0"
+    records = list(iter_records(filename))
+
+    assert [r["datetime"] for r in records] == [
+        datetime(2020, 5, 20, 19, 8, 35),
+        datetime(2020, 5, 20, 22, 36, 2),
+        datetime(2020, 5, 20, 22, 36, 5),
+    ]
+    assert records[0]["line"].endswith("compiled with version: 8.3.0 on 20 May 2020 19:02:11\n")
+    assert records[1]["line"].endswith("ValueError: example\n")
+    assert "".join(r["line"] for r in records) == uwsgi_data
+
+
+def test_chunked_records(create_uwsgi_logs_file):
+    """
+    Records parsed in small chunks by process pool are the same as records parsed in one stream
+    """
+    filename = "mysite/sortlogs/tests/fixtures/example-com-stdout---supervisor.log.0"
+    chunked_records = ChunkedRecords(filename, workers=2, chunk_size=50)
+
+    assert list(chunked_records) == list(iter_records(filename))
+    assert chunked_records.lines_number == 7
+
+
+def test_iter_blocks_bounded(tmp_path):
+    """
+    Highly compressed gzip members are decompressed in blocks not bigger than size
+    """
+    data = b"GET / HTTP/1.1 200\n" * 100000
+    file_path = tmp_path / "access.log.1.gz"
+    file_path.write_bytes(gzip.compress(data) + gzip.compress(data[:1000]))
+    blocks = list(iter_blocks(str(file_path), size=4096))
+
+    assert max(len(block) for block in blocks) <= 4096
+    assert b"".join(blocks) == data + data[:1000]
+
+
+@pytest.mark.parametrize("parser_class", FAST_DATE_PARSERS)
+def test_fast_date_equals_strptime(parser_class):
+    """
+    Fast datetime decoders give the same datetime as strptime
+    """
+    parser = parser_class()
+    rnd = random.Random(parser_class.__name__)
+    for _ in range(2000):
+        text = random_date_string(rnd, parser.datetime_format)
+        expected = strptime_or_none(text, parser.datetime_format)
+        result = parser.fast_date(text)
+
+        assert result == expected, text
+        assert result.tzinfo == expected.tzinfo, text
+
+    for text in EDGE_DATE_STRINGS:
+        expected = strptime_or_none(text, parser.datetime_format)
+        result = fast_date_or_none(parser, text)
+
+        assert result is None or result == expected, text
+        assert parser.get_date(text) == expected, text
+
+
+def test_celery_parse_line():
+    """
+    Celery datetime is between `[` and `: `
+    """
+    line = "[2019-06-03 03:41:18,934: ERROR/MainProcess] consumer: Cannot connect to redis\n"
+
+    assert CeleryParser().parse_line(line) == datetime(2019, 6, 3, 3, 41, 18, 934000)
+
+
+@pytest.mark.parametrize(
+    "level, lines, years",
+    [
+        (
+            Level.INFO,
+            [
+                "Dec 30 10:00:00 a\n",
+                "Dec 31 10:00:00 b\n",
+                "  continuation\n",
+                "Jan  2 10:00:00 c\n",
+            ],
+            [2020, 2020, 2021],
+        ),
+        (
+            Level.ERROR,
+            ["Jan  2 10:00:00 a\n", "Dec 31 10:00:00 b\n", "Nov 30 10:00:00 c\n"],
+            [2021, 2020, 2020],
+        ),
+        (Level.INFO, ["2019 Dec 31 10:00:00 a\n", "Jan  1 10:00:00 b\n"], [2019, 2020]),
+        # late line doesn't move later lines to the next year
+        (
+            Level.INFO,
+            ["Apr  1 10:00:00 a\n", "Mar 30 10:00:00 b\n", "May  1 10:00:00 c\n"],
+            [2020, 2020, 2020],
+        ),
+    ],
+)
+def test_mail_parser_infers_year(level, lines, years):
+    """
+    Year of mail lines changes at Dec -> Jan, mail.err has lines from newer to older. Lines with
+    year set year of next lines.
+    """
+    parser = MailParser(level=level, year=2021, month=1)
+    records = list(iter_lines_records(lines, parser))
+
+    assert [r["datetime"].year for r in records] == years
+
+
+def test_get_date_memoized():
+    """
+    The same date string is decoded only once
+    """
+    parser = NginxLogParser()
+    dates = [
+        "16/Feb/2020:06:24:23 +0000",
+        "16/Feb/2020:06:24:23 +0000",
+        "16/Feb/2020:06:24:24 +0000",
+    ]
+    results = [parser.get_date(text) for text in dates + dates[:1]]
+
+    assert results[0] is results[1] is results[3]
+    assert results[2] == datetime.strptime(dates[2], NginxLogParser.datetime_format)
+    assert parser.cache_info() == {"hits": 2, "misses": 2, "size": 2}
+
+
+def test_nginx_parse_fields():
+    """
+    Fields from combined log line, short line without referer and user agent
+    """
+    parser = NginxLogParser()
+    line = (
+        '1.2.3.4 - - [16/Feb/2020:06:24:23 +0000] "GET /api/items?page=2 HTTP/1.1" 502 191 '
+        '"https://example.com/" "Mozilla/5.0 (X11; Linux x86_64)"\n'
+    )
+
+    assert parser.parse_fields(line) == {
+        "remote_addr": "1.2.3.4",
+        "method": "GET",
+        "path": "/api/items?page=2",
+        "protocol": "HTTP/1.1",
+        "status": 502,
+        "body_bytes": 191,
+        "referer": "https://example.com/",
+        "user_agent": "Mozilla/5.0 (X11; Linux x86_64)",
+    }
+    assert parser.parse_fields('5.6.7.8 - - [17/Nov/2020:06:55:53 +0000] "-" 400\n') == {
+        "remote_addr": "5.6.7.8",
+        "status": 400,
+    }
@@ -1,4 +1,14 @@
+import datetime
+import gzip
+import json
+
 import pytest
+from asgiref.sync import async_to_sync
+
+from ..mongo import clients
+from ..mongo.async_logs import AsyncLogsFromDb
+from ..mongo.logs_load import Loader, LogsFromDb
+from ..structure import MAX_VOLUME_DAYS
 
 
 @pytest.mark.django_db
@@ -80,6 +90,17 @@ def test_show_date_logs_post(auto_login_staff, create_input_data_mongo):
     )
     assert expected2 in response.content
 
+    # export is separate GET form with search conditions and without CSRF token
+    export_form = response.content.split(b'<form action="/admin/export-logs/" method="get">')[1]
+    export_form = export_form.split(b"</form>")[0]
+    assert b'<input type="hidden" name="table" value="log_nginx_example_443"' in export_form
+    assert b'name="export_format"' in export_form and b'name="compress"' in export_form
+    assert b"csrfmiddlewaretoken" not in export_form
+
+    # condition without tokens is an error, not search for every line
+    response = client.post("/admin/search-logs/", data=dict(data, contains="a #"))
+    assert list(response.context_data["form"].errors) == ["contains"]
+
 
 @pytest.mark.django_db
 def test_graph_logs(auto_login_staff):
@@ -90,3 +111,240 @@ def test_graph_logs(auto_login_staff):
     response = client.get("/admin/graph-logs", follow=True)
     assert response.status_code == 200
     assert response.template_name == ["sortlogs/graph_logs.html"]
+
+
+@pytest.mark.django_db
+def test_search_logs_fields_filter(auto_login_staff, mongodb):
+    """
+    Test search nginx logs by status class and path prefix
+    """
+    mongodb.log_nginx_example_443.insert_many([{
+        "datetime": datetime.datetime(year=2021, month=8, day=22, hour=0, minute=0, second=58),
+        "line": '1.2.3.4 - - [22/Aug/2021:00:00:58 +0000] "GET /api/a HTTP/1.1" 200',
+        "path": "/api/a",
+        "status": 200,
+    },{
+        "datetime": datetime.datetime(year=2021, month=8, day=22, hour=0, minute=0, second=59),
+        "line": '1.2.3.4 - - [22/Aug/2021:00:00:59 +0000] "GET /api/b HTTP/1.1" 502',
+        "path": "/api/b",
+        "status": 502,
+    },{
+        "datetime": datetime.datetime(year=2021, month=8, day=22, hour=0, minute=1, second=16),
+        "line": '4.3.2.1 - - [22/Aug/2021:00:01:16 +0000] "GET /pl HTTP/1.1" 500',
+        "path": "/pl",
+        "status": 500,
+    }])
+    client, user = auto_login_staff()
+    data = {
+        "table": "log_nginx_example_443",
+        "start_datetime": "2021-08-17 12:50:59",
+        "end_datetime": "2021-08-30 23:59:59",
+        "limit": "10",
+        "status": "5xx",
+        "path": "/api",
+    }
+    response = client.post("/admin/search-logs/", data=data, follow=False)
+    assert response.status_code == 200
+    assert b"GET /api/b" in response.content
+    assert b"GET /api/a" not in response.content
+    assert b"GET /pl" not in response.content
+
+
+@pytest.mark.django_db
+def test_get_logs_page(mongodb):
+    """
+    Pages by (datetime, _id) key in both directions, lines with the same datetime are not lost
+    """
+    first = datetime.datetime(2021, 8, 22, 0, 0, 58)
+    mongodb.log_nginx_example_443.insert_many([
+        {"datetime": first + datetime.timedelta(seconds=n // 2), "line": f"line {n}"}
+        for n in range(5)
+    ])
+    logs_from_db = LogsFromDb()
+    end = datetime.datetime(2021, 8, 30)
+
+    def get_page(**kwargs):
+        page = logs_from_db.get_logs_page("log_nginx_example_443", first, end, 2, **kwargs)
+        return [r["line"] for r in page["logs"]], page["previous"], page["next"]
+
+    lines, previous_page, next_page = get_page()
+    assert lines == ["line 0", "line 1"] and previous_page is None
+    lines, previous_page, next_page = get_page(after=LogsFromDb.parse_page_key(next_page))
+    assert lines == ["line 2", "line 3"]
+    lines, previous_page, last_page = get_page(after=LogsFromDb.parse_page_key(next_page))
+    assert lines == ["line 4"] and last_page is None
+    lines, previous_page, next_page = get_page(before=LogsFromDb.parse_page_key(previous_page))
+    assert lines == ["line 2", "line 3"] and previous_page is not None
+
+    lines, previous_page, next_page = get_page(newest_first=True)
+    assert lines == ["line 4", "line 3"] and previous_page is None
+    lines, previous_page, next_page = get_page(
+        newest_first=True, after=LogsFromDb.parse_page_key(next_page)
+    )
+    assert lines == ["line 2", "line 1"]
+
+
+@pytest.mark.django_db
+def test_async_logs_from_db(mongodb):
+    """
+    Async reads return the same records as sync ones
+    """
+    first = datetime.datetime(2021, 8, 22, 0, 0, 58)
+    mongodb.log_nginx_example_443.insert_many([
+        {"datetime": first + datetime.timedelta(seconds=n), "line": f"line {n}"} for n in range(3)
+    ])
+    mongodb.log_nginx_example_80.insert_one({"datetime": first, "line": "other"})
+    mongodb.a_loaded_files.insert_one(
+        {"filename": "access.log", "collection_name": "log_nginx_example_443"}
+    )
+    end = datetime.datetime(2021, 8, 30)
+
+    async def read():
+        logs_from_db = AsyncLogsFromDb()
+        try:
+            return (
+                await logs_from_db.get_tables(),
+                await logs_from_db.get_logs("log_nginx_example_443", first, end, 2),
+                await logs_from_db.get_logs_page("log_nginx_example_443", first, end, 2),
+                await logs_from_db.get_timeline(
+                    ["log_nginx_example_443", "log_nginx_example_80"], first, end, 2
+                ),
+                await logs_from_db.get_loaded_files("log_nginx_example_443"),
+            )
+        finally:
+            # loop of async_to_sync ends with the call
+            await clients.close_async_clients()
+
+    tables, logs, page, timeline, loaded_files = async_to_sync(read)()
+    logs_from_db = LogsFromDb()
+    assert tables == logs_from_db.get_tables()
+    assert logs == list(logs_from_db.get_logs("log_nginx_example_443", first, end, 2))
+    assert page == logs_from_db.get_logs_page("log_nginx_example_443", first, end, 2)
+    assert [r["line"] for r in timeline] == ["line 0", "other"]
+    assert [r["filename"] for r in loaded_files] == ["access.log"]
+
+
+@pytest.mark.django_db
+def test_wsgi_views_use_shared_client(auto_login_staff):
+    """
+    Under WSGI every request has its own event loop, async views don't make asyncio client for it
+    """
+    client, user = auto_login_staff()
+    for _ in range(2):
+        assert client.get("/admin/show-tables", follow=True).status_code == 200
+
+    assert not clients.async_clients
+
+
+@pytest.mark.django_db
+def test_export_logs(auto_login_staff, create_input_data_mongo):
+    """
+    Export streams logs as NDJSON, CSV and gzipped raw lines, in order of search
+    """
+    client, user = auto_login_staff()
+    data = {
+        "table": "log_nginx_example_443",
+        "start_datetime": "2021-08-17 12:50:59",
+        "end_datetime": "2021-08-30 23:59:59",
+    }
+    response = client.get("/admin/export-logs/", data=data)
+    assert response.streaming
+    records = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert [r["datetime"] for r in records] == [
+        "2021-08-22T00:00:58",
+        "2021-08-22T00:00:59",
+        "2021-08-22T00:01:16",
+    ]
+
+    response = client.get(
+        "/admin/export-logs/", data=dict(data, export_format="csv", fields="line", limit=1)
+    )
+    assert b"".join(response.streaming_content) == (
+        b'line\r\n"1.2.3.4 - - [22/Aug/2021:00:00:58 +0000] ""GET / HTTP/1.1"" 200"\r\n'
+    )
+
+    response = client.get("/admin/export-logs/", data=dict(data, export_format="lines", compress=1))
+    assert response["Content-Type"] == "application/gzip"
+    lines = gzip.decompress(b"".join(response.streaming_content)).decode().splitlines()
+    assert lines[2] == '4.3.2.1 - - [22/Aug/2021:00:01:16 +0000] "GET /mysite.html HTTP/1.1" 200'
+
+    response = client.get(
+        "/admin/export-logs/", data=dict(data, export_format="lines", newest_first="on", limit=1)
+    )
+    assert b"".join(response.streaming_content) == (
+        b'4.3.2.1 - - [22/Aug/2021:00:01:16 +0000] "GET /mysite.html HTTP/1.1" 200\n'
+    )
+
+
+@pytest.mark.django_db
+def test_timeline_logs(auto_login_staff, create_input_data_mongo, mongodb):
+    """
+    Lines from two tables are merged by datetime and tagged with table name
+    """
+    mongodb.log_uwsgi_example_.insert_one({
+        "datetime": datetime.datetime(year=2021, month=8, day=22, hour=0, minute=0, second=59),
+        "line": "[pid: 1|app: 0|req: 1/1] 1.2.3.4 () {52 vars} GET /pl => 200",
+    })
+    logs = LogsFromDb().get_timeline(
+        ["log_nginx_example_443", "log_uwsgi_example_"],
+        datetime.datetime(2021, 8, 17),
+        datetime.datetime(2021, 8, 30),
+        3,
+    )
+    assert [r["source"] for r in logs] == [
+        "log_nginx_example_443",
+        "log_nginx_example_443",
+        "log_uwsgi_example_",
+    ]
+
+    client, user = auto_login_staff()
+    data = {
+        "tables": ["log_nginx_example_443", "log_uwsgi_example_"],
+        "start_datetime": "2021-08-17 12:50:59",
+        "end_datetime": "2021-08-30 23:59:59",
+        "limit": "10",
+        "newest_first": "on",
+    }
+    response = client.post("/admin/timeline-logs/", data=data)
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert content.index("GET /mysite.html") < content.index("log_uwsgi_example_</span>")
+
+
+@pytest.mark.django_db
+def test_volume_graph(mongodb, auto_login_staff, tmp_path):
+    """
+    Rollups count only new lines, nginx lines are counted by status class
+    """
+    lines = [
+        '1.2.3.4 - - [22/Aug/2021:00:00:58 +0000] "GET / HTTP/1.1" 200\n',
+        '1.2.3.4 - - [22/Aug/2021:00:00:59 +0000] "GET /pl HTTP/1.1" 502\n',
+        '1.2.3.4 - - [22/Aug/2021:01:10:00 +0000] "GET /pl HTTP/1.1" 200\n',
+    ]
+    for filename in ("example.com-443-access.log.1", "example.com-443-access.log.2"):
+        (tmp_path / filename).write_text("".join(lines))
+        Loader().load_file_logs(str(tmp_path / filename))
+
+    logs_from_db = LogsFromDb()
+    rollups = logs_from_db.get_rollups(
+        "log_nginx_example_443",
+        "hour",
+        datetime.datetime(2021, 8, 22),
+        datetime.datetime(2021, 8, 23),
+    )
+    assert [(r["time"].hour, r["count"], r["statuses"]) for r in rollups] == [
+        (0, 2, {"2xx": 1, "5xx": 1}),
+        (1, 1, {"2xx": 1}),
+    ]
+    assert logs_from_db.get_rollups(
+        "log_nginx_example_443", "day", datetime.datetime(2021, 8, 1), datetime.datetime(2021, 9, 1)
+    )[0]["count"] == 3
+
+    client, user = auto_login_staff()
+    response = client.get("/admin/volume-graph/?table=log_nginx_example_443&unit=day&days=1")
+    assert response.status_code == 200
+    assert response.template_name == ["sortlogs/volume_graph.html"]
+
+    response = client.get("/admin/volume-graph/?table=log_nginx_example_443&days=1000000")
+    assert response.status_code == 200
+    assert response.context_data["days"] == MAX_VOLUME_DAYS
@@ -0,0 +1,199 @@
+"""
+Fast decoders for datetime formats used by log parsers. Every decoder reads fixed positions of
+the string and returns the same datetime as datetime.strptime with parser datetime_format. When
+the string has other shape, decoder raises ValueError and parser falls back to strptime.
+"""
+from datetime import datetime, timedelta, timezone
+
+MONTHS = {
+    name: number
+    for number, name in enumerate(
+        ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"),
+        start=1,
+    )
+}
+WEEKDAYS = {"Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"}
+UTC_NAMES = {"UTC", "GMT"}
+time_zones: dict[str, timezone] = {}
+
+
+def number(text: str) -> int:
+    """
+    Convert ASCII digits to int. Other chars (signs, spaces, underscores) are not allowed.
+    """
+    if not (text.isascii() and text.isdigit()):
+        raise ValueError(f"Not a number: {text!r}")
+    return int(text)
+
+
+def day_number(text: str) -> int:
+    """
+    Day of month can be padded with space like in "May  5"
+    """
+    if text[0] == " ":
+        text = text[1:]
+    return number(text)
+
+
+def month_number(text: str) -> int:
+    """
+    Month number from abbreviated month name
+    """
+    try:
+        return MONTHS[text]
+    except KeyError:
+        raise ValueError(f"Not a month name: {text!r}")
+
+
+def microseconds(text: str) -> int:
+    """
+    Fraction of second with 1 - 6 digits like %f
+    """
+    if not 0 < len(text) <= 6:
+        raise ValueError(f"Wrong fraction of second: {text!r}")
+    return number(text) * 10 ** (6 - len(text))
+
+
+def time_zone(text: str) -> timezone:
+    """
+    Time zone from offset like "+0100", objects are cached
+    """
+    try:
+        return time_zones[text]
+    except KeyError:
+        pass
+
+    if len(text) != 5 or text[0] not in "+-":
+        raise ValueError(f"Wrong time zone offset: {text!r}")
+    offset = timedelta(hours=number(text[1:3]), minutes=number(text[3:5]))
+    time_zones[text] = timezone(-offset if text[0] == "-" else offset)
+    return time_zones[text]
+
+
+def check_separators(text: str, length: int, separators: dict[int, str]) -> None:
+    """
+    Check length of string and chars on separator positions
+    """
+    if len(text) != length:
+        raise ValueError(f"Wrong length: {text!r}")
+    for position, char in separators.items():
+        if text[position] != char:
+            raise ValueError(f"Wrong separator at {position}: {text!r}")
+
+
+def nginx_log_time(text: str) -> datetime:
+    """
+    "16/Feb/2020:06:24:23 +0000" -> %d/%b/%Y:%H:%M:%S %z
+    """
+    check_separators(text, 26, {2: "/", 6: "/", 11: ":", 14: ":", 17: ":", 20: " "})
+    return datetime(
+        number(text[7:11]),
+        month_number(text[3:6]),
+        day_number(text[0:2]),
+        number(text[12:14]),
+        number(text[15:17]),
+        number(text[18:20]),
+        tzinfo=time_zone(text[21:26]),
+    )
+
+
+def nginx_err_time(text: str) -> datetime:
+    """
+    "2020/06/30 06:24:53" -> %Y/%m/%d %H:%M:%S
+    """
+    check_separators(text, 19, {4: "/", 7: "/", 10: " ", 13: ":", 16: ":"})
+    return datetime(
+        number(text[0:4]),
+        number(text[5:7]),
+        day_number(text[8:10]),
+        number(text[11:13]),
+        number(text[14:16]),
+        number(text[17:19]),
+    )
+
+
+def uwsgi_time(text: str) -> datetime:
+    """
+    "Wed May 20 19:08:35 2020" -> %a %b %d %H:%M:%S %Y
+    """
+    check_separators(text, 24, {3: " ", 7: " ", 10: " ", 13: ":", 16: ":", 19: " "})
+    if text[0:3] not in WEEKDAYS:
+        raise ValueError(f"Not a weekday name: {text!r}")
+    return datetime(
+        number(text[20:24]),
+        month_number(text[4:7]),
+        day_number(text[8:10]),
+        number(text[11:13]),
+        number(text[14:16]),
+        number(text[17:19]),
+    )
+
+
+def iso_time_with_fraction(text: str, fraction_separator: str) -> datetime:
+    """
+    "2019-06-03 03:41:18,934" -> %Y-%m-%d %H:%M:%S,%f (celery, supervisord)
+    "2021-09-02 17:23:40.866" -> %Y-%m-%d %H:%M:%S.%f (postgresql without zone)
+    """
+    if len(text) < 21 or text[19] != fraction_separator:
+        raise ValueError(f"Wrong fraction of second: {text!r}")
+    check_separators(text[:19], 19, {4: "-", 7: "-", 10: " ", 13: ":", 16: ":"})
+    return datetime(
+        number(text[0:4]),
+        number(text[5:7]),
+        day_number(text[8:10]),
+        number(text[11:13]),
+        number(text[14:16]),
+        number(text[17:19]),
+        microseconds(text[20:]),
+    )
+
+
+def celery_time(text: str) -> datetime:
+    """
+    "2019-06-03 03:41:18,934" -> %Y-%m-%d %H:%M:%S,%f
+    """
+    return iso_time_with_fraction(text, ",")
+
+
+def postgres_time(text: str) -> datetime:
+    """
+    "2021-09-02 17:23:40.866 UTC" -> %Y-%m-%d %H:%M:%S.%f %Z, only UTC and GMT zones which give
+    naive datetime like strptime
+    """
+    text, _, zone = text.rpartition(" ")
+    if zone not in UTC_NAMES:
+        raise ValueError(f"Not supported zone name: {zone!r}")
+    return iso_time_with_fraction(text, ".")
+
+
+def redis_time(text: str) -> datetime:
+    """
+    "28 Aug 2022 00:01:00.138" -> %d %b %Y %H:%M:%S.%f
+    """
+    if len(text) < 22 or text[20] != ".":
+        raise ValueError(f"Wrong fraction of second: {text!r}")
+    check_separators(text[:20], 20, {2: " ", 6: " ", 11: " ", 14: ":", 17: ":"})
+    return datetime(
+        number(text[7:11]),
+        month_number(text[3:6]),
+        day_number(text[0:2]),
+        number(text[12:14]),
+        number(text[15:17]),
+        number(text[18:20]),
+        microseconds(text[21:]),
+    )
+
+
+def mail_time(text: str) -> datetime:
+    """
+    "2019 Jun  4 06:36:43" -> %Y %b %d %H:%M:%S
+    """
+    check_separators(text, 20, {4: " ", 8: " ", 11: " ", 14: ":", 17: ":"})
+    return datetime(
+        number(text[0:4]),
+        month_number(text[5:8]),
+        day_number(text[9:11]),
+        number(text[12:14]),
+        number(text[15:17]),
+        number(text[18:20]),
+    )
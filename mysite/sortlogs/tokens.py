@@ -0,0 +1,42 @@
+"""
+Tokens of log lines for search by content. Every record gets list of its tokens (words, IPs,
+paths, request ids) which is indexed together with datetime, so search for lines containing
+tokens uses index instead of regex on every line. Every line of record (ex. traceback) has its
+own limit of tokens.
+"""
+import re
+
+from .structure import MAX_LINE_TOKENS
+
+TOKEN_PATTERN = re.compile(r"[\w.:/@-]+")
+# chars removed from both ends of token, "error:" and "error" are the same token
+TOKEN_STRIP = ".:-"
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 100
+
+
+def line_tokens(line: str, max_tokens: int = MAX_LINE_TOKENS) -> list[str]:
+    """
+    Unique lowercase tokens of line in order of the first occurrence. Too short and too long
+    tokens are skipped and only max_tokens first tokens are taken.
+    """
+    tokens: dict[str, None] = {}
+    for match in TOKEN_PATTERN.finditer(line):
+        token = match.group().strip(TOKEN_STRIP).lower()
+        if MIN_TOKEN_LENGTH <= len(token) <= MAX_TOKEN_LENGTH:
+            tokens[token] = None
+            if len(tokens) >= max_tokens:
+                break
+    return list(tokens)
+
+
+def record_tokens(text: str, max_tokens: int = MAX_LINE_TOKENS) -> list[str]:
+    """
+    Unique tokens of all lines of record, max_tokens first tokens are taken from every line.
+    Continuation lines appended to record later get the same tokens as if they were loaded with
+    it.
+    """
+    tokens: dict[str, None] = {}
+    for line in text.splitlines():
+        tokens.update(dict.fromkeys(line_tokens(line, max_tokens)))
+    return list(tokens)
@@ -1,49 +1,170 @@
+import datetime
 from typing import Optional
 
-from django.shortcuts import render
-from django.urls import reverse_lazy
-from django.views.generic import FormView, TemplateView
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from django.views.generic import FormView, TemplateView, View
 
-from .forms import ShowLogsForm
+from .export import EXPORT_FORMATS, export_records
+from .forms import ExportLogsForm, ShowLogsForm, TimelineLogsForm
+from .mongo.async_logs import get_async_logs_from_db
+from .mongo.clients import pool_stats
 from .mongo.logs_load import LogsFromDb
+from .mongo.rollups import ROLLUP_UNITS
 from .graphs import input_structure
+from .structure import EXPORT_BATCH_SIZE, MAX_VOLUME_DAYS, TIME_RANGE_DAYS
+
+
+def get_filters(form) -> dict:
+    """
+    Conditions for fields from cleaned data of search form
+    """
+    return LogsFromDb.fields_filter(
+        status=form.cleaned_data["status"],
+        path=form.cleaned_data["path"],
+        remote_addr=form.cleaned_data["remote_addr"],
+        contains=form.cleaned_data["contains"],
+    )
 
 
 class SearchLogs(FormView):
     """
-    Show log collection names
+    Show log collection names. View is async, it waits for db without holding a thread.
     """
 
     template_name = "sortlogs/search_logs.html"
     form_class = ShowLogsForm
     tables_list: Optional[list] = None
-    success_url = reverse_lazy("sortlogs:search_logs")
 
-    def get_form(self, form_class=None):
+    async def get_tables_form(self):
         """
         form needs list of collections
         """
-        form = super().get_form(form_class=form_class)
-        logs_from_db = LogsFromDb()
-        self.tables_list = logs_from_db.get_tables()
+        form = self.get_form()
+        self.tables_list = await get_async_logs_from_db(self.request).get_tables()
         form.set_table_choices(self.tables_list)
         form.set_initial()
         return form
 
-    def form_valid(self, form):
+    async def get(self, request, *args, **kwargs):
+        """
+        Render empty form
+        """
+        form = await self.get_tables_form()
+        return self.render_to_response(self.get_context_data(form=form))
+
+    async def post(self, request, *args, **kwargs):
         """
-        Render the same form with data bellow form.
+        Validate form and show logs
+        """
+        form = await self.get_tables_form()
+        if form.is_valid():
+            return await self.form_valid(form)
+        return self.form_invalid(form)
+
+    async def put(self, *args, **kwargs):
+        return await self.post(*args, **kwargs)
+
+    async def form_valid(self, form):
+        """
+        Render the same form with page of logs bellow form. Buttons of next and previous page
+        send key of the last or the first shown log line.
         """
         table_name = form.cleaned_data["table"]
         start_datetime = form.cleaned_data["start_datetime"]
         end_datetime = form.cleaned_data["end_datetime"]
         logs_limit = form.cleaned_data["limit"]
+        filters = get_filters(form)
+        page = await get_async_logs_from_db(self.request).get_logs_page(
+            table_name,
+            start_datetime,
+            end_datetime,
+            logs_limit,
+            filters,
+            after=LogsFromDb.parse_page_key(self.request.POST.get("after")),
+            before=LogsFromDb.parse_page_key(self.request.POST.get("before")),
+            newest_first=form.cleaned_data["newest_first"],
+        )
         context = {
             "form": form,
-            "logs": LogsFromDb().get_logs(table_name, start_datetime, end_datetime, logs_limit),
+            "logs": page["logs"],
+            "next_page": page["next"],
+            "previous_page": page["previous"],
             "values_list": self.tables_list,
+            "export_form": ExportLogsForm.from_search(form),
         }
-        return render(self.request, self.template_name, context)
+        return self.render_to_response(context)
+
+
+class TimelineLogs(SearchLogs):
+    """
+    Show logs from many tables merged by time, every line with its table name
+    """
+
+    template_name = "sortlogs/timeline_logs.html"
+    form_class = TimelineLogsForm
+
+    async def form_valid(self, form):
+        """
+        Render the same form with merged logs bellow form
+        """
+        filters = get_filters(form)
+        context = {
+            "form": form,
+            "logs": await get_async_logs_from_db(self.request).get_timeline(
+                form.cleaned_data["tables"],
+                form.cleaned_data["start_datetime"],
+                form.cleaned_data["end_datetime"],
+                form.cleaned_data["limit"],
+                filters,
+                newest_first=form.cleaned_data["newest_first"],
+            ),
+            "values_list": self.tables_list,
+        }
+        return self.render_to_response(context)
+
+
+class ExportLogs(View):
+    """
+    Stream logs found by search conditions (GET params) as file. Records are read from db in
+    batches and sent as they come, so memory doesn't grow with number of exported lines.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """
+        Validate conditions and start streaming
+        """
+        logs_from_db = LogsFromDb()
+        form = ExportLogsForm(request.GET)
+        form.set_table_choices(logs_from_db.get_tables())
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+
+        table_name = form.cleaned_data["table"]
+        export_format = form.cleaned_data["export_format"]
+        fields = ["line"] if export_format == "lines" else form.cleaned_data["fields"]
+        filters = get_filters(form)
+        records = logs_from_db.get_logs(
+            table_name,
+            form.cleaned_data["start_datetime"],
+            form.cleaned_data["end_datetime"],
+            form.cleaned_data["limit"] or 0,
+            filters,
+            projection=fields,
+            batch_size=EXPORT_BATCH_SIZE,
+            newest_first=form.cleaned_data["newest_first"],
+        )
+        content_type, extension = EXPORT_FORMATS[export_format]
+        filename = f"{table_name}{extension}"
+        if form.cleaned_data["compress"]:
+            content_type = "application/gzip"
+            filename = f"{filename}.gz"
+        response = StreamingHttpResponse(
+            export_records(records, export_format, fields, form.cleaned_data["compress"]),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
 
 class ShowTables(TemplateView):
@@ -53,13 +174,15 @@ class ShowTables(TemplateView):
 
     template_name = "sortlogs/show_tables.html"
 
-    def get_context_data(self, **kwargs):
+    async def get(self, request, *args, **kwargs):
         """
         Get logs list
         """
-        context = super().get_context_data(**kwargs)
-        context["values_list"] = LogsFromDb().get_tables()
-        return context
+        context = self.get_context_data(**kwargs)
+        context["catalog"] = await get_async_logs_from_db(self.request).get_catalog()
+        context["values_list"] = list(context["catalog"])
+        context["pool_stats"] = pool_stats.get_stats()
+        return self.render_to_response(context)
 
 
 class ShowLoadedFiles(TemplateView):
@@ -69,17 +192,17 @@ class ShowLoadedFiles(TemplateView):
 
     template_name = "sortlogs/show_loaded_files.html"
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
         context["table_name"] = self.request.GET.get("table")
-        logs_from_db = LogsFromDb()
-        if context["table_name"] not in logs_from_db.get_tables():
+        logs_from_db = get_async_logs_from_db(self.request)
+        if context["table_name"] not in await logs_from_db.get_tables():
             context[
                 "error_message"
             ] = f"ERROR: Table name '{context['table_name']}' not found in db!"
         else:
-            context["values_list"] = LogsFromDb().get_loaded_files(context["table_name"])
-        return context
+            context["values_list"] = await logs_from_db.get_loaded_files(context["table_name"])
+        return self.render_to_response(context)
 
 
 class GraphLogs(TemplateView):
@@ -96,3 +219,55 @@ class GraphLogs(TemplateView):
         context = super().get_context_data(**kwargs)
         context["table"], context["col_headers"], context["row_headers"] = input_structure()
         return context
+
+
+class VolumeGraph(TemplateView):
+    """
+    Show number of log lines in time for table. Counts are read from rollups, not from logs.
+    """
+
+    template_name = "sortlogs/volume_graph.html"
+
+    def get_context_data(self, **kwargs):
+        """
+        Get counts per unit (minute, hour, day) for the last days and make bars of them
+        """
+        context = super().get_context_data(**kwargs)
+        logs_from_db = LogsFromDb()
+        context["table_name"] = self.request.GET.get("table")
+        if context["table_name"] not in logs_from_db.get_tables():
+            context["error_message"] = (
+                f"ERROR: Table name '{context['table_name']}' not found in db!"
+            )
+            return context
+
+        unit = self.request.GET.get("unit")
+        context["unit"] = unit if unit in ROLLUP_UNITS else "hour"
+        try:
+            days = int(self.request.GET.get("days", TIME_RANGE_DAYS))
+            context["days"] = max(1, min(days, MAX_VOLUME_DAYS))
+        except ValueError:
+            context["days"] = TIME_RANGE_DAYS
+        context["units"] = list(ROLLUP_UNITS)
+
+        end_datetime = timezone.now()
+        rollups = logs_from_db.get_rollups(
+            context["table_name"],
+            context["unit"],
+            end_datetime - datetime.timedelta(days=context["days"]),
+            end_datetime,
+        )
+        max_count = max((rollup["count"] for rollup in rollups), default=1)
+        status_classes = sorted({c for rollup in rollups for c in rollup.get("statuses", {})})
+        context["status_classes"] = status_classes
+        context["rows"] = [
+            {
+                "time": rollup["time"],
+                "count": rollup["count"],
+                "width": round(100 * rollup["count"] / max_count),
+                "statuses": [rollup.get("statuses", {}).get(c, 0) for c in status_classes],
+                "error_rate": 100 * rollup.get("statuses", {}).get("5xx", 0) / rollup["count"],
+            }
+            for rollup in rollups
+        ]
+        return context
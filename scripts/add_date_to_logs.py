@@ -8,9 +8,11 @@ chronological order.
 from datetime import datetime
 import gzip
 import logging
+import mmap
 import os
 from pathlib import Path
-from typing import TextIO
+import tempfile
+from typing import IO, Iterator, TextIO
 
 import typer
 
@@ -27,54 +29,79 @@ def get_month_from_line(line: str) -> int:
     return datetime.strptime(month, "%b").month
 
 
+def reverse_lines(f: IO[bytes]) -> Iterator[bytes]:
+    """
+    Yield lines of binary file from the last one to the first one. File is mapped to memory, so
+    only pages with lines being read are loaded and memory does not grow with file size.
+    """
+    f.flush()
+    size = os.fstat(f.fileno()).st_size
+    if not size:
+        return
+    with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+        end = size
+        while end > 0:
+            start = mapped.rfind(b"\n", 0, end - 1) + 1
+            yield mapped[start:end]
+            end = start
+
+
 def process_mail_err_file(f: TextIO, f_dest: TextIO, year: int) -> None:
     """
-    Mail error logs have reverse chronology line - from newer to older
+    Mail error logs have reverse chronology line - from newer to older. Year is known for the
+    newest line, so lines with year are written to temporary file in one pass from newer to
+    older, then the temporary file is read backwards and lines are written from older to newer.
     """
     month_nr_before: int = 12
-    file_data = []
-    for line in f.readlines():
-        month_nr = get_month_from_line(line)
-        if month_nr > month_nr_before:
-            year -= 1
-            logging.info(f"Year changed in mail.err: {year=}")
-        month_nr_before = month_nr
-        file_data.insert(0, f"{year} {line}")
+    with tempfile.TemporaryFile() as f_tmp:
+        for line in f:
+            month_nr = get_month_from_line(line)
+            if month_nr > month_nr_before:
+                year -= 1
+                logging.info(f"Year changed in mail.err: {year=}")
+            month_nr_before = month_nr
+            if not line.endswith("\n"):
+                line += "\n"
+            f_tmp.write(f"{year} {line}".encode())
 
-    # write data from list to file
-    for line in file_data:
-        f_dest.write(line)
+        for line in reverse_lines(f_tmp):
+            f_dest.write(line.decode())
 
 
 def process_mail_log_file(f: TextIO, f_dest: TextIO, years: list) -> None:
     """
-    Process mail.log, mail.info and mail.warn files
+    Process mail.log, mail.info and mail.warn files. Year is known for the last line, so lines
+    are copied to temporary file while Dec to Jan jumps are counted in one pass over input file.
+    Then lines from the temporary file get their years.
     """
     month_nr_before: int = 1
-    for line in f.readlines():
-        # find if file has logs from more years than one. It means find Dec to Jan jumps.
-        month_nr = get_month_from_line(line)
-        if month_nr < month_nr_before:
-            # year has changed
-            # add to list older year: [2020] -> [2019, 2020]
-            years.insert(0, years[0] - 1)
-            logging.info(f"Added to years list: {years=}")
-        month_nr_before = month_nr
-
-    f.seek(0)
-    month_nr_before = 1
-    year_index = 0
-    year = years[year_index]
-    # now you have years you want to write to new file
-    for line in f.readlines():
-        month_nr = get_month_from_line(line)
-        if month_nr < month_nr_before:
-            # get next year
-            year = years[year_index]
-            year_index += 1
-            logging.info(f"Year changed: {year=}  {year_index=}")
-        # add year and write log line
-        f_dest.write(f"{year} {line}")
+    with tempfile.TemporaryFile("w+t") as f_tmp:
+        for line in f:
+            # find if file has logs from more years than one. It means find Dec to Jan jumps.
+            month_nr = get_month_from_line(line)
+            if month_nr < month_nr_before:
+                # year has changed
+                # add to list older year: [2020] -> [2019, 2020]
+                years.insert(0, years[0] - 1)
+                logging.info(f"Added to years list: {years=}")
+            month_nr_before = month_nr
+            f_tmp.write(line)
+
+        f_tmp.seek(0)
+        month_nr_before = 1
+        year_index = 0
+        year = years[year_index]
+        # now you have years you want to write to new file
+        for line in f_tmp:
+            month_nr = get_month_from_line(line)
+            if month_nr < month_nr_before:
+                # get next year
+                year_index += 1
+                year = years[year_index]
+                logging.info(f"Year changed: {year=}  {year_index=}")
+            month_nr_before = month_nr
+            # add year and write log line
+            f_dest.write(f"{year} {line}")
 
 
 def main(
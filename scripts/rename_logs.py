@@ -3,21 +3,55 @@
 Gzip and rename log files in order that was changed (by mtime).
 ./rename_logs.py example.com-443-access.log
 """
+from concurrent.futures import ThreadPoolExecutor
+import gzip
 import logging
 import os
 from itertools import count
 from pathlib import Path
-import subprocess
+import shutil
+import tempfile
 import typer
 
 # files in this directory can be overwritten.
 DIRECTORY_DEST: str = "converted_logs"
 FIRST_FILENAME_NUMBER: int = 1000
 EXT: str = ".gz"
+COMPRESS_LEVEL: int = 6  # the same default as gzip command
+COPY_BUFFER_SIZE: int = 1024 * 1024  # bytes compressed at once, zlib releases the GIL for them
 
 logging.basicConfig(level=logging.INFO)
 
 
+def compress_file(filename: str, destination_path: Path, level: int = COMPRESS_LEVEL) -> None:
+    """
+    Gzip file to destination and remove it like gzip command does. Compressed data is written to
+    temporary file in destination dir which replaces destination file when it is complete, so
+    destination never has partial file. Permissions, access and modification times are kept.
+    """
+    stat = os.stat(filename)
+    f_tmp = tempfile.NamedTemporaryFile(
+        dir=destination_path.parent, prefix=f".{destination_path.name}.", delete=False
+    )
+    try:
+        with f_tmp, open(filename, "rb") as f:
+            with gzip.GzipFile(
+                filename=filename,
+                mode="wb",
+                compresslevel=level,
+                fileobj=f_tmp,
+                mtime=stat.st_mtime,
+            ) as f_gzip:
+                shutil.copyfileobj(f, f_gzip, COPY_BUFFER_SIZE)
+        shutil.copymode(filename, f_tmp.name)
+        os.utime(f_tmp.name, (stat.st_atime, stat.st_mtime))
+        os.replace(f_tmp.name, destination_path)
+    except BaseException:
+        os.remove(f_tmp.name)
+        raise
+    os.remove(filename)
+
+
 def main(
     base_filename: str = typer.Argument(
         ...,
@@ -30,10 +64,15 @@ def main(
         dir_okay=True,
         file_okay=False,
     ),
+    level: int = typer.Option(COMPRESS_LEVEL, min=1, max=9, help="gzip compression level"),
+    workers: int = typer.Option(
+        os.cpu_count() or 1, min=1, help="number of files compressed at the same time"
+    ),
 ):
     """
     Rename and gzip files from current dir and move them to a new destination. Destination has to
-    exist. Gzip file only if not gzipped.
+    exist. Gzip file only if not gzipped. Numbers of new filenames follow mtime order, files are
+    compressed in parallel by thread pool.
     """
     listdir: list[str] = os.listdir(".")
     listdir = list(filter(lambda x: x.startswith(base_filename), listdir))
@@ -46,27 +85,27 @@ def main(
     counter = count(FIRST_FILENAME_NUMBER)
     destination_path = None
 
-    for line in listdir_ext:
-        filename = line[0]
-        if filename.endswith(EXT):
-            filename_gzipped = filename
-        else:
-            # use system gzip command to gzip file
-            subprocess.check_call(["gzip", filename])
-            # Note that unix gzip command rename file it is command gzip adds .gz to filename.
-            # When command asks you about overwrite file then chose no, move renamed files again
-            # to current directory and run process again.
-            filename_gzipped = f"{filename}{EXT}"
-
-        new_filename = f"{base_filename}.{next(counter)}{EXT}"
-        destination_path = destination.joinpath(new_filename)
-
-        while destination_path.exists():
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for line in listdir_ext:
+            filename = line[0]
             new_filename = f"{base_filename}.{next(counter)}{EXT}"
             destination_path = destination.joinpath(new_filename)
 
-        os.rename(filename_gzipped, destination_path)
-        logging.info(f"{filename} \t-> {destination_path}")
+            while destination_path.exists():
+                new_filename = f"{base_filename}.{next(counter)}{EXT}"
+                destination_path = destination.joinpath(new_filename)
+
+            if filename.endswith(EXT):
+                os.rename(filename, destination_path)
+                logging.info(f"{filename} \t-> {destination_path}")
+            else:
+                future = executor.submit(compress_file, filename, destination_path, level)
+                futures.append((future, filename, destination_path))
+
+        for future, filename, path in futures:
+            future.result()
+            logging.info(f"{filename} \t-> {path}")
 
     if FIRST_FILENAME_NUMBER == next(counter):
         logging.info(f"Didn't find any files to rename for {base_filename}.")
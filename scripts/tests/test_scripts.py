@@ -1,3 +1,6 @@
+import gzip
+import io
+import os
 import pytest
 import sys
 from datetime import datetime
@@ -31,6 +34,24 @@ def test_rename_logs():
         assert example.result2.exists() is True
 
 
+def test_compress_file(tmp_path):
+    """
+    File is gzipped to destination and removed, permissions and modification time are kept
+    """
+    source = tmp_path / "example.com-443-access.log"
+    source.write_text("Some example logs\n" * 1000)
+    source.chmod(0o640)
+    os.utime(source, (1600000000, 1600000000))
+    destination_path = tmp_path / "example.com-443-access.log.1000.gz"
+    rename_logs.compress_file(str(source), destination_path, level=1)
+
+    assert not source.exists()
+    assert os.listdir(tmp_path) == [destination_path.name]
+    assert gzip.decompress(destination_path.read_bytes()) == b"Some example logs\n" * 1000
+    assert destination_path.stat().st_mtime == 1600000000
+    assert destination_path.stat().st_mode & 0o777 == 0o640
+
+
 def test_add_date_to_logs():
     """
     Test command `./add_date_to_logs.py mail.err.01 --destination=tmp_dest_files`
@@ -85,3 +106,34 @@ def test_add_date_to_logs_info_filename():
             input_data += f"{datetime.now().year} {line}\n"
 
         assert result == input_data
+
+
+def test_process_mail_err_file_year_changed():
+    """
+    Lines of mail.err are written from older to newer with year changed at Jan -> Dec
+    """
+    f = io.StringIO("Jan  2 10:00:00 a\nJan  1 10:00:00 b\nDec 31 10:00:00 c\nDec 30 10:00:00 d")
+    f_dest = io.StringIO()
+    add_date_to_logs.process_mail_err_file(f, f_dest, 2021)
+
+    assert f_dest.getvalue() == (
+        "2020 Dec 30 10:00:00 d\n"
+        "2020 Dec 31 10:00:00 c\n"
+        "2021 Jan  1 10:00:00 b\n"
+        "2021 Jan  2 10:00:00 a\n"
+    )
+
+
+def test_process_mail_log_file_year_changed():
+    """
+    Lines after Dec -> Jan jump get the year of file mtime, lines before get the previous year
+    """
+    f = io.StringIO("Dec 31 10:00:00 a\nJan  1 10:00:00 b\nJan  2 10:00:00 c\n")
+    f_dest = io.StringIO()
+    years = [2021]
+    add_date_to_logs.process_mail_log_file(f, f_dest, years)
+
+    assert years == [2020, 2021]
+    assert f_dest.getvalue() == (
+        "2020 Dec 31 10:00:00 a\n2021 Jan  1 10:00:00 b\n2021 Jan  2 10:00:00 c\n"
+    )